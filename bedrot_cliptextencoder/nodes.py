@@ -18,7 +18,26 @@ Utility Syntax:
 - trigger/@/target1,target2/@/: Suppression rules - when trigger present, targets removed
 """
 
+import functools
 import re
+import sys
+
+# Precompiled patterns for the preprocessing pipeline
+_FLAG_RE = re.compile(r'\[(\d+)\]')
+_INVALID_NEG_RE = re.compile(r'\[-\d+\]')
+# Flag tokens and bare negative tokens in one alternation
+_FLAG_TOKEN_RE = re.compile(r'\[(?:(?P<flag>\d+)|-\d+)\]')
+_BLOCK_COMMENT_RE = re.compile(r'///start[\s\S]*?///end')
+_SUPPRESS_RULE_RE = re.compile(r'(?:^|,\s*)([^,/@]+)/@/([^/@]+)/@/')
+_SUPPRESS_MARK_RE = re.compile(r'/@/[^/@]+/@/')
+_BRACKET_CHAR_RE = re.compile(r'[()\[\]{}]')
+# Bracket characters plus conditional heads [K: in one token stream
+_BRACKET_TOKEN_RE = re.compile(r'\[(?:([+-]?\d+):\s*)?|[\](){}]')
+# Separators skipped after a bypassed group / a bypassed tag's comma
+_GROUP_TAIL_RE = re.compile(r'[, \t]*')
+_TAG_TAIL_RE = re.compile(r'[ \t]*')
+
+_BRACKET_PAIRS = {'(': ')', '[': ']', '{': '}'}
 
 
 class BedrotCLIPTextEncode:
@@ -27,6 +46,18 @@ class BedrotCLIPTextEncode:
     before passing it to the standard CLIP encoder.
     """
 
+    _FLAG_RE = _FLAG_RE
+    _INVALID_NEG_RE = _INVALID_NEG_RE
+    _FLAG_TOKEN_RE = _FLAG_TOKEN_RE
+    _BLOCK_COMMENT_RE = _BLOCK_COMMENT_RE
+    _SUPPRESS_RULE_RE = _SUPPRESS_RULE_RE
+    _SUPPRESS_MARK_RE = _SUPPRESS_MARK_RE
+    _BRACKET_CHAR_RE = _BRACKET_CHAR_RE
+    _BRACKET_TOKEN_RE = _BRACKET_TOKEN_RE
+    _GROUP_TAIL_RE = _GROUP_TAIL_RE
+    _TAG_TAIL_RE = _TAG_TAIL_RE
+    _BRACKET_PAIRS = _BRACKET_PAIRS
+
     @classmethod
     def INPUT_TYPES(cls):
         return {
@@ -71,7 +102,8 @@ class BedrotCLIPTextEncode:
             )
 
         # Preprocess text to apply conditional bracket logic
-        processed_text = self._preprocess_conditional_brackets(text)
+        # (memoized: reruns of an unchanged prompt skip the preprocessor)
+        processed_text = _preprocess_cached(type(self), text)
 
         # Encode with standard CLIP logic
         tokens = clip.tokenize(processed_text)
@@ -105,44 +137,42 @@ class BedrotCLIPTextEncode:
             Text with bypassed tags removed
         """
         result = []
-        i = 0
-        bracket_map = {'(': ')', '[': ']', '{': '}'}
-
-        while i < len(text):
-            # Check for --- pattern
-            if text[i:i+3] == '---':
-                i += 3  # Skip past ---
-
-                # Check if followed by an opening bracket
-                if i < len(text) and text[i] in bracket_map:
-                    open_char = text[i]
-                    close_char = bracket_map[open_char]
-                    end = self._find_matching_bracket(text, i + 1, open_char, close_char)
-
-                    if end != -1:
-                        # Found matching bracket - skip to after it
-                        i = end + 1
-                    else:
-                        # Unbalanced bracket - remove to end of string
-                        break
-
-                    # Skip trailing comma and whitespace
-                    while i < len(text) and text[i] in ', \t':
-                        i += 1
-                    continue
-
-                # No bracket - fall back to removing until comma
-                while i < len(text) and text[i] != ',':
-                    i += 1
-                # Skip the comma and trailing whitespace
-                if i < len(text) and text[i] == ',':
-                    i += 1
-                while i < len(text) and text[i] in ' \t':
-                    i += 1
+        length = len(text)
+        kept_start = 0
+        bracket_map = None
+
+        # Kept text is copied as whole slices between bypass markers
+        i = text.find('---')
+        while i != -1:
+            result.append(text[kept_start:i])
+            i += 3  # Skip past ---
+
+            # Check if followed by an opening bracket
+            if i < length and text[i] in self._BRACKET_PAIRS:
+                if bracket_map is None:
+                    bracket_map = self._build_bracket_map(text)
+                end = bracket_map.get(i, -1)
+
+                if end == -1:
+                    # Unbalanced bracket - remove to end of string
+                    return ''.join(result)
+
+                # Found matching bracket - skip to after it, then skip
+                # trailing commas and whitespace (matched in place, no copy)
+                i = self._GROUP_TAIL_RE.match(text, end + 1).end()
             else:
-                result.append(text[i])
-                i += 1
+                # No bracket - fall back to removing until comma
+                i = text.find(',', i)
+                if i == -1:
+                    i = length
+                else:
+                    # Skip the comma and trailing whitespace
+                    i = self._TAG_TAIL_RE.match(text, i + 1).end()
 
+            kept_start = i
+            i = text.find('---', i)
+
+        result.append(text[kept_start:])
         return ''.join(result)
 
     def _process_block_comments(self, text):
@@ -163,7 +193,7 @@ class BedrotCLIPTextEncode:
             Text with block comments removed
         """
         # Non-greedy match to handle multiple blocks correctly
-        return re.sub(r'///start[\s\S]*?///end', '', text)
+        return self._BLOCK_COMMENT_RE.sub('', text)
 
     def _extract_suppress_rules(self, text):
         """
@@ -187,18 +217,17 @@ class BedrotCLIPTextEncode:
         """
         rules = {}
         # Match trigger (from start or after comma) followed by /@/targets/@/
-        pattern = r'(?:^|,\s*)([^,/@]+)/@/([^/@]+)/@/'
-
-        for match in re.finditer(pattern, text):
-            trigger = match.group(1).strip().lower()
-            targets = [t.strip().lower() for t in match.group(2).split(',')]
+        # Interned so later membership tests against tags can match by identity
+        for match in self._SUPPRESS_RULE_RE.finditer(text):
+            trigger = sys.intern(match.group(1).strip().lower())
+            targets = [sys.intern(t.strip().lower()) for t in match.group(2).split(',')]
             if trigger in rules:
                 rules[trigger].extend(targets)
             else:
                 rules[trigger] = targets
 
         # Remove only the /@/.../@/ portions, keep trigger tag
-        cleaned = re.sub(r'/@/[^/@]+/@/', '', text)
+        cleaned = self._SUPPRESS_MARK_RE.sub('', text)
         return rules, cleaned
 
     def _apply_suppress_rules(self, text, rules):
@@ -216,54 +245,167 @@ class BedrotCLIPTextEncode:
             return text
 
         tags = [t.strip() for t in text.split(',')]
-        tags_lower = [t.lower() for t in tags]
+
+        # A tag can only match if it occurs as a substring of the whole
+        # prompt, so one scan of the lowercased text rules out most prompts
+        # before any per-tag work (the trigger itself usually stays in the
+        # prompt; its targets usually don't)
+        text_lower = text.lower()
+        candidates = set()
+        for trigger, targets in rules.items():
+            if trigger in text_lower:
+                candidates.update(t for t in targets if t in text_lower)
+
+        if not candidates:
+            return ', '.join(tags)
+
+        tags_lower = [sys.intern(t.lower()) for t in tags]
+        tags_lower_set = frozenset(tags_lower)
 
         # Find which targets to suppress based on present triggers
         to_suppress = set()
         for trigger, targets in rules.items():
-            if trigger in tags_lower:
+            if trigger in tags_lower_set:
                 to_suppress.update(targets)
 
+        if not to_suppress:
+            return ', '.join(tags)
+
         # Filter out suppressed tags (case-insensitive matching)
         result = [t for t, t_low in zip(tags, tags_lower)
                   if t_low not in to_suppress]
         return ', '.join(result)
 
-    def _find_matching_bracket(self, text, start_pos, open_char, close_char):
+    def _build_bracket_map(self, text, positions=None):
         """
-        Find the position of the matching closing bracket, respecting nesting.
+        Find the matching closing bracket for every opening bracket at once.
+
+        Matching respects nesting of the same bracket type and skips over
+        balanced groups of other bracket types, so mixed nesting like
+        [1: {a|b}] or ---(tag1, [2: x]) resolves correctly. Closing brackets
+        of another type are ignored, and an unbalanced group of the same type
+        leaves every enclosing group unbalanced too.
+
+        Well-formed text is matched with a simple stack. Anything else falls
+        back to _resolve_bracket_map, which implements the rules above.
 
-        Handles nested brackets of the same type and tracks other bracket types
-        to properly handle mixed nesting like [1: {a|b}] or ---(tag1, [2: x]).
+        Example:
+            Input:  "a [1: (b)] c"
+            Output: {2: 9, 6: 8}
 
         Args:
-            text: The text to search in
-            start_pos: Position to start searching (after the opening bracket)
-            open_char: The opening bracket character (e.g., '(', '[', '{')
-            close_char: The closing bracket character (e.g., ')', ']', '}')
+            text: The text to scan
+            positions: Sorted positions of every bracket character in text,
+                if already known
 
         Returns:
-            Position of the matching closing bracket, or -1 if not found
+            Dict mapping each opening bracket position to its matching
+            closing bracket position. Unbalanced openers are omitted.
         """
-        depth = 1
-        pos = start_pos
-        bracket_pairs = {'(': ')', '[': ']', '{': '}'}
+        if positions is None:
+            positions = [m.start() for m in self._BRACKET_CHAR_RE.finditer(text)]
+
+        pairs = self._BRACKET_PAIRS
+        stack = []
+        bracket_map = {}
 
-        while pos < len(text) and depth > 0:
+        for pos in positions:
             char = text[pos]
-            if char == close_char:
-                depth -= 1
-            elif char == open_char:
-                depth += 1
-            elif char in bracket_pairs and char != open_char:
-                # Different bracket type - find its matching close to skip over it
-                inner_close = bracket_pairs[char]
-                inner_end = self._find_matching_bracket(text, pos + 1, char, inner_close)
-                if inner_end != -1:
-                    pos = inner_end
-            pos += 1
-
-        return pos - 1 if depth == 0 else -1
+            if char in pairs:
+                stack.append(pos)
+            elif stack and pairs[text[stack[-1]]] == char:
+                bracket_map[stack.pop()] = pos
+            else:
+                return self._resolve_bracket_map(text, positions)
+
+        if stack:
+            return self._resolve_bracket_map(text, positions)
+        return bracket_map
+
+    def _resolve_bracket_map(self, text, positions):
+        """
+        Bracket matching for text with stray or unbalanced brackets.
+
+        Only bracket characters are visited, right to left: each opener's
+        match is known once everything after it has been resolved, so the
+        whole map is built in a single O(n) pass instead of rescanning the
+        text from every opener.
+
+        Args:
+            text: The text to scan
+            positions: Sorted positions of every bracket character in text
+
+        Returns:
+            Dict mapping each opening bracket position to its matching
+            closing bracket position. Unbalanced openers are omitted.
+        """
+        count = len(positions)
+
+        # paren[k] / square[k] / curly[k]: index (into positions) of the first
+        # closer of that type found when scanning from bracket k and skipping
+        # balanced groups, or -1
+        paren = [-1] * (count + 1)
+        square = [-1] * (count + 1)
+        curly = [-1] * (count + 1)
+        reach = {'(': paren, '[': square, '{': curly}
+        bracket_map = {}
+
+        for k in range(count - 1, -1, -1):
+            char = text[positions[k]]
+            after = k + 1
+
+            # Closing bracket: found for its own type, ignored by others
+            if char == ')':
+                paren[k], square[k], curly[k] = k, square[after], curly[after]
+                continue
+            if char == ']':
+                paren[k], square[k], curly[k] = paren[after], k, curly[after]
+                continue
+            if char == '}':
+                paren[k], square[k], curly[k] = paren[after], square[after], k
+                continue
+
+            own = reach[char]
+            end = own[after]
+            if end != -1:
+                # Balanced group - scans starting here resume after it
+                bracket_map[positions[k]] = positions[end]
+                end += 1
+                paren[k], square[k], curly[k] = paren[end], square[end], curly[end]
+            else:
+                # Unbalanced - fatal for its own type, skipped by the others
+                paren[k], square[k], curly[k] = paren[after], square[after], curly[after]
+                own[k] = -1
+
+        return bracket_map
+
+    def _scan_brackets(self, text):
+        """
+        Tokenize the bracket structure of the text in a single regex pass.
+
+        Collects the position of every bracket character together with each
+        conditional block head [K: so that matching and evaluation work from
+        the token list instead of rescanning the text.
+
+        Args:
+            text: The text to scan
+
+        Returns:
+            Tuple of (bracket_map, heads)
+            - bracket_map: see _build_bracket_map
+            - heads: list of (position, flag_id, content_start) for every
+              [K: head, in text order
+        """
+        positions = []
+        heads = []
+
+        for match in self._BRACKET_TOKEN_RE.finditer(text):
+            pos = match.start()
+            positions.append(pos)
+            if match.group(1) is not None:
+                heads.append((pos, int(match.group(1)), match.end()))
+
+        return self._build_bracket_map(text, positions), heads
 
     def _evaluate_conditional_blocks(self, text, active_flags):
         """
@@ -274,55 +416,160 @@ class BedrotCLIPTextEncode:
         - [1: (text:1.2)] - weights inside conditional
         - [1: text [2: nested]] - nested conditionals
 
+        Parsing and evaluation are separate: the block structure comes from
+        _compile_cached, so re-running a prompt with different flags only
+        walks the compiled segments.
+
         Args:
             text: Text with conditional blocks to evaluate
             active_flags: Set of active flag IDs
 
+        Returns:
+            Text with conditional blocks resolved based on active flags
+        """
+        segments = _compile_cached(type(self), text)
+        return self._emit_conditional_blocks(segments, active_flags)
+
+    def _compile_conditional_blocks(self, text):
+        """
+        Parse the conditional blocks of the text into a segment tree.
+
+        The text is tokenized once by _scan_brackets, then the heads are
+        walked in order with a stack of enclosing blocks instead of
+        recursion, so nesting depth costs nothing extra. Unbalanced heads
+        stay part of the surrounding literal text.
+
+        Example:
+            Input:  "a [1: b [-2: c]] d"
+            Output: ["a ", (1, ["b ", (-2, ["c"])]), " d"]
+
+        Args:
+            text: Text with conditional blocks, flag tokens already removed
+
+        Returns:
+            List of segments, each either a literal string or a
+            (flag_id, children) tuple for a block. Treat as read-only:
+            compiled segments are shared through the cache.
+        """
+        bracket_map, heads = self._scan_brackets(text)
+        if not heads:
+            return [text]
+
+        segments = []
+        pos = 0
+        end = len(text)
+        # (segments, end) of the blocks enclosing the current one
+        outer = []
+
+        for head, flag_id, content_start in heads:
+            # Leave every block that closes before this head,
+            # dropping its closing bracket
+            while head >= end:
+                if pos < end:
+                    segments.append(text[pos:end])
+                pos = end + 1
+                segments, end = outer.pop()
+
+            close = bracket_map.get(head, -1)
+            if close == -1 or close >= end:
+                # Unbalanced bracket - keep the text as-is
+                continue
+
+            if pos < head:
+                segments.append(text[pos:head])
+
+            children = []
+            segments.append((flag_id, children))
+            outer.append((segments, end))
+            segments = children
+            end = close
+            pos = content_start
+
+        while outer:
+            if pos < end:
+                segments.append(text[pos:end])
+            pos = end + 1
+            segments, end = outer.pop()
+
+        if pos < end:
+            segments.append(text[pos:end])
+        return segments
+
+    def _emit_conditional_blocks(self, segments, active_flags):
+        """
+        Render compiled segments for a set of active flags.
+
+        Args:
+            segments: Output of _compile_conditional_blocks
+            active_flags: Set of active flag IDs
+
         Returns:
             Text with conditional blocks resolved based on active flags
         """
         result = []
-        i = 0
-
-        while i < len(text):
-            # Look for conditional block pattern: [K: or [-K:
-            match = re.match(r'\[([+-]?\d+):\s*', text[i:])
-            if match and text[i] == '[':
-                flag_id = int(match.group(1))
-                content_start = i + match.end()
-
-                # Find matching ] using bracket counting
-                end = self._find_matching_bracket(text, content_start, '[', ']')
-
-                if end != -1:
-                    content = text[content_start:end]
-
-                    # Evaluate based on flag state
-                    if flag_id > 0:
-                        # Positive: keep if flag is active
-                        if flag_id in active_flags:
-                            # Recursively evaluate nested conditionals
-                            result.append(self._evaluate_conditional_blocks(content, active_flags))
-                    elif flag_id < 0:
-                        # Negative: keep if flag is NOT active
-                        if abs(flag_id) not in active_flags:
-                            result.append(self._evaluate_conditional_blocks(content, active_flags))
-                    # flag_id == 0: always remove (edge case)
+        # Iterators over the segment lists of the kept blocks we are inside
+        stack = [iter(segments)]
 
-                    i = end + 1
+        while stack:
+            for segment in stack[-1]:
+                if segment.__class__ is str:
+                    result.append(segment)
                     continue
+
+                flag_id, children = segment
+                # Evaluate based on flag state
+                if flag_id > 0:
+                    # Positive: keep if flag is active
+                    keep = flag_id in active_flags
                 else:
-                    # Unbalanced bracket - treat remaining text as content
-                    # Keep the [ and continue character by character
-                    result.append(text[i])
-                    i += 1
-                    continue
+                    # Negative: keep if flag is NOT active
+                    # flag_id == 0: always remove (edge case)
+                    keep = flag_id < 0 and abs(flag_id) not in active_flags
 
-            result.append(text[i])
-            i += 1
+                if keep:
+                    # Descend; the enclosing iterator resumes after the block
+                    stack.append(iter(children))
+                    break
+            else:
+                stack.pop()
 
         return ''.join(result)
 
+    def _clean_whitespace(self, text):
+        """
+        Normalize whitespace and commas in a single split/join pass.
+
+        Equivalent to the sequential cleanup of collapsing runs of spaces,
+        removing whitespace before commas, collapsing repeated commas,
+        dropping a leading comma and trimming the result, but each comma
+        separated piece is only visited once and no regex is involved.
+
+        Example:
+            Input:  " , hello ,  , world  "
+            Output: "hello, world"
+
+        Args:
+            text: Text to normalize
+
+        Returns:
+            Normalized text
+        """
+        parts = text.split(',')
+        last = parts.pop()
+        # Whitespace before a comma is dropped; pieces left empty are
+        # repeated (or leading) commas and are dropped with it
+        parts = [part for part in map(str.rstrip, parts) if part]
+        parts.append(last)
+        text = ','.join(parts)
+
+        # Collapse multiple spaces to single space. str.replace runs in C
+        # and each pass halves every run, so this converges in O(log n)
+        while '  ' in text:
+            text = text.replace('  ', ' ')
+
+        # Trim leading and trailing whitespace
+        return text.strip()
+
     def _preprocess_conditional_brackets(self, text):
         """
         Process the conditional bracket language in the input text.
@@ -346,51 +593,87 @@ class BedrotCLIPTextEncode:
         Returns:
             Processed text with brackets resolved
         """
+        # Each stage is skipped when its marker is absent, which is the common
+        # case for plain prompts; substring checks are far cheaper than the scans
+
         # Step 0: Process tag bypass (---tag)
-        text = self._process_tag_bypass(text)
+        if '---' in text:
+            text = self._process_tag_bypass(text)
 
         # Step 0.5: Process block comments (///start...///end)
-        text = self._process_block_comments(text)
+        if '///start' in text:
+            text = self._process_block_comments(text)
+
+        if '[' in text:
+            # Steps 1-3: Collect all flag tokens [N] where N is a positive integer
+            # into active_flags, and remove them together with invalid bare
+            # negative tokens [-N] (noise, they never create flags) in one pass
+            active_flags = set()
+
+            def _collect_flag(match, add=active_flags.add):
+                flag = match.group('flag')
+                if flag is not None:
+                    add(int(flag))
+                return ''
+
+            stripped = self._FLAG_TOKEN_RE.sub(_collect_flag, text)
+
+            # Removing a flag can join the pieces of a new [-N] token, as in
+            # [-[1]5]. Sequentially that token is removed by step 3; it is
+            # also left behind here, so only then redo steps 2-3 in order
+            if '[-' in stripped and self._INVALID_NEG_RE.search(stripped):
+                stripped = self._INVALID_NEG_RE.sub('', self._FLAG_RE.sub('', text))
+            text = stripped
+
+            # Step 4: Evaluate conditional blocks [K: content] using bracket-aware parsing
+            # This handles nested content like [1: {a|b}] and [1: (text:1.2)] correctly
+            if ':' in text:
+                text = self._evaluate_conditional_blocks(text, active_flags)
+
+        # Step 5: Extract and apply suppression rules (/@/.../@/)
+        # This happens after conditional blocks so suppression can be defined inside [K: ...]
+        if '/@/' in text:
+            suppress_rules, text = self._extract_suppress_rules(text)
+            text = self._apply_suppress_rules(text, suppress_rules)
+
+        # Step 6: Clean up whitespace and punctuation
+        return self._clean_whitespace(text)
 
-        # Step 1: Find all flag tokens [N] where N is a positive integer
-        # Pattern matches [digits] where there's no colon inside
-        flag_pattern = r'\[(\d+)\]'
-        active_flags = set()
 
-        for match in re.finditer(flag_pattern, text):
-            flag_id = int(match.group(1))
-            active_flags.add(flag_id)
+@functools.lru_cache(maxsize=256)
+def _preprocess_cached(node_class, text):
+    """
+    Memoized wrapper around _preprocess_conditional_brackets.
 
-        # Step 2: Remove all flag tokens [N] from text
-        text = re.sub(flag_pattern, '', text)
+    Preprocessing is a pure function of the text, so repeated executions
+    of the same prompt (new seeds, sampler tweaks) reuse the result.
 
-        # Step 3: Remove invalid bare negative tokens [-N] (negative number, no colon)
-        # These are noise and should not create flags
-        invalid_neg_pattern = r'\[-\d+\]'
-        text = re.sub(invalid_neg_pattern, '', text)
+    Args:
+        node_class: Node class whose preprocessor to use
+        text: Raw prompt text
 
-        # Step 4: Evaluate conditional blocks [K: content] using bracket-aware parsing
-        # This handles nested content like [1: {a|b}] and [1: (text:1.2)] correctly
-        text = self._evaluate_conditional_blocks(text, active_flags)
+    Returns:
+        Processed text
+    """
+    return node_class()._preprocess_conditional_brackets(text)
 
-        # Step 5: Extract and apply suppression rules (/@/.../@/)
-        # This happens after conditional blocks so suppression can be defined inside [K: ...]
-        suppress_rules, text = self._extract_suppress_rules(text)
-        text = self._apply_suppress_rules(text, suppress_rules)
 
-        # Step 6: Clean up whitespace and punctuation
-        # Collapse multiple spaces to single space
-        text = re.sub(r'  +', ' ', text)
-        # Remove spaces before commas
-        text = re.sub(r'\s+,', ',', text)
-        # Collapse multiple commas (with optional whitespace) to single comma
-        text = re.sub(r',(\s*,)+', ',', text)
-        # Remove leading commas
-        text = re.sub(r'^\s*,\s*', '', text)
-        # Trim leading and trailing whitespace
-        text = text.strip()
+@functools.lru_cache(maxsize=256)
+def _compile_cached(node_class, text):
+    """
+    Memoized wrapper around _compile_conditional_blocks.
+
+    The key is the text after flag tokens are removed, so prompts that only
+    differ in which [N] flags they set share one parse.
 
-        return text
+    Args:
+        node_class: Node class whose parser to use
+        text: Text with conditional blocks, flag tokens already removed
+
+    Returns:
+        Compiled segments (shared, do not modify)
+    """
+    return node_class()._compile_conditional_blocks(text)
 
 
 # Node registration for ComfyUI
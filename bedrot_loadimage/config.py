@@ -1,14 +1,31 @@
 """
 BEDROT Load Image - Config Management
 
-Handles persistence of linked external folders.
+Handles persistence of linked external folders, plus the folder
+listings shared by the node and the API routes.
 """
 
+import hashlib
 import os
 import json
 
 CONFIG_FILE = "linked_folders.json"
 
+# Extensions every mimetypes table maps to image/*, so they can skip
+# content-type filtering
+IMAGE_EXTENSIONS = frozenset({".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff"})
+
+# Parsed linked folders, keyed on the config file's (st_mtime_ns, st_size),
+# with a lowercase name -> path map for lookups
+_linked_folders_cache = {"key": None, "folders": [], "paths": {}}
+
+# Local group names, keyed on the base folder's st_mtime_ns: as listed,
+# and lowercased for lookups
+_local_names_cache = {"key": None, "names": (), "lower": frozenset()}
+
+# Image listings per directory: path -> (st_mtime_ns, images, etag)
+_image_files_cache = {}
+
 
 def _get_config_path():
     """Get path to the config file in the same directory as this module."""
@@ -21,20 +38,163 @@ def _get_base_input_path():
     return os.path.join(folder_paths.get_input_directory(), "BedRot_custom_image_load")
 
 
-def _get_local_group_names():
-    """Get set of local group names (subdirectories in base folder)."""
+def filter_image_files(files):
+    """
+    Keep the image files from a list of file names, preserving order.
+
+    Names with a common image extension are accepted directly; only the
+    rest go through folder_paths.filter_files_content_types.
+    """
+    unknown = [f for f in files
+               if os.path.splitext(f)[1].lower() not in IMAGE_EXTENSIONS]
+    if not unknown:
+        return list(files)
+
+    import folder_paths
+    accepted = set(folder_paths.filter_files_content_types(unknown, ["image"]))
+    return [f for f in files
+            if f in accepted or os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS]
+
+
+def _listing_etag(images):
+    """Strong ETag for a list of file names."""
+    # surrogatepass: undecodable names come back from scandir as surrogates
+    data = "\0".join(images).encode("utf-8", "surrogatepass")
+    return '"%s"' % hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+_EMPTY_LISTING = ([], _listing_etag([]))
+
+
+def cached_image_files(directory):
+    """
+    Cached list of image files in a directory (shared, do not modify).
+
+    The listing is cached until the directory's mtime changes, which
+    happens whenever a file is added, removed or renamed in it.
+
+    Returns:
+        tuple: (images: list, etag: str) - image names sorted
+               case-insensitively and an ETag for them, computed once per
+               listing; empty if the directory can't be read
+    """
+    try:
+        key = os.stat(directory).st_mtime_ns
+    except OSError:
+        return _EMPTY_LISTING
+
+    cached = _image_files_cache.get(directory)
+    if cached is None or cached[0] != key:
+        # DirEntry caches the file type from readdir, so no stat per file
+        try:
+            with os.scandir(directory) as entries:
+                files = [entry.name for entry in entries if entry.is_file()]
+        except OSError:
+            # Removed or replaced since the stat; not cached
+            return _EMPTY_LISTING
+        images = filter_image_files(files)
+        images.sort(key=str.lower)
+        cached = (key, images, _listing_etag(images))
+        _image_files_cache[directory] = cached
+
+    return cached[1], cached[2]
+
+
+def _scan_local_groups():
+    """
+    Refresh the cached local group names (subdirectories in base folder).
+
+    The scan is cached until the base folder's mtime changes, which
+    happens whenever a group is created, renamed or deleted.
+
+    Raises:
+        OSError: If the base folder can't be read; nothing is cached
+    """
     base_path = _get_base_input_path()
-    if not os.path.exists(base_path):
-        return set()
+    key = os.stat(base_path).st_mtime_ns
+    if _local_names_cache["key"] != key:
+        with os.scandir(base_path) as entries:
+            names = tuple(entry.name for entry in entries if entry.is_dir())
+        _local_names_cache["key"] = key
+        _local_names_cache["names"] = names
+        _local_names_cache["lower"] = frozenset(name.lower() for name in names)
+    return _local_names_cache
+
+
+def get_local_group_names():
+    """
+    Get local group names as listed (subdirectories in base folder).
+
+    Returns:
+        tuple: Group names, in directory order
+
+    Raises:
+        OSError: If the base folder can't be read
+    """
+    return _scan_local_groups()["names"]
+
 
-    names = set()
+def _get_local_group_names():
+    """
+    Get set of local group names (subdirectories in base folder).
+
+    A missing base folder costs only the failed stat.
+
+    Returns:
+        frozenset: Lowercase local group names
+    """
     try:
-        for entry in os.scandir(base_path):
-            if entry.is_dir():
-                names.add(entry.name.lower())
+        # Immutable, so the cached set can be shared with callers
+        return _scan_local_groups()["lower"]
     except OSError:
-        pass
-    return names
+        return frozenset()
+
+
+def invalidate_listings(*directories):
+    """
+    Drop cached listings after an API route modified the folders: the
+    local group names, and the image listings of the given directories.
+
+    Directory mtimes can have coarse resolution (FAT, SMB), so a listing
+    right after a change could otherwise still match the old key.
+    """
+    _local_names_cache["key"] = None
+    for directory in directories:
+        _image_files_cache.pop(directory, None)
+
+
+def _refresh_linked_folders():
+    """
+    Re-parse the config file if it changed since it was last read.
+
+    The parsed file is cached until its mtime or size changes, so repeated
+    lookups during a request cost a single stat call.
+
+    Returns:
+        bool: False if the config file doesn't exist
+    """
+    config_path = _get_config_path()
+    try:
+        st = os.stat(config_path)
+    except OSError:
+        return False
+
+    key = (st.st_mtime_ns, st.st_size)
+    if _linked_folders_cache["key"] != key:
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                folders = data.get("linked_folders", [])
+        except (json.JSONDecodeError, OSError):
+            folders = []
+        paths = {}
+        for folder in folders:
+            # First entry wins, as in a linear search
+            paths.setdefault(folder["name"].lower(), folder["path"])
+        _linked_folders_cache["key"] = key
+        _linked_folders_cache["folders"] = folders
+        _linked_folders_cache["paths"] = paths
+    return True
 
 
 def load_linked_folders():
@@ -44,30 +204,48 @@ def load_linked_folders():
     Returns:
         list: List of dicts with 'name' and 'path' keys
     """
-    config_path = _get_config_path()
-    if not os.path.exists(config_path):
+    if not _refresh_linked_folders():
         return []
 
-    try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data.get("linked_folders", [])
-    except (json.JSONDecodeError, OSError):
-        return []
+    # Callers may append to the list before saving, so hand out a copy
+    return list(_linked_folders_cache["folders"])
+
+
+def _linked_folder_paths():
+    """Get the cached lowercase name -> path map of linked folders."""
+    if not _refresh_linked_folders():
+        return {}
+    return _linked_folders_cache["paths"]
 
 
 def save_linked_folders(folders):
     """
     Save linked folders to config file.
 
+    The file is written to a temporary sibling and moved into place with
+    os.replace, so a crash mid-write never leaves a truncated config.
+
     Args:
         folders: List of dicts with 'name' and 'path' keys
     """
     config_path = _get_config_path()
-    data = {"linked_folders": folders}
+    tmp_path = config_path + ".tmp"
+    # dumps (not dump) with no indent takes the C encoder fast path
+    payload = json.dumps({"linked_folders": folders}, separators=(',', ':'))
 
-    with open(config_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(tmp_path, config_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Don't rely on mtime resolution to notice our own write
+    _linked_folders_cache["key"] = None
 
 
 def get_all_linked_names():
@@ -77,8 +255,7 @@ def get_all_linked_names():
     Returns:
         set: Set of lowercase linked folder names
     """
-    folders = load_linked_folders()
-    return {f["name"].lower() for f in folders}
+    return set(_linked_folder_paths())
 
 
 def get_linked_folder_path(name):
@@ -91,12 +268,7 @@ def get_linked_folder_path(name):
     Returns:
         str or None: Absolute path if found, None otherwise
     """
-    folders = load_linked_folders()
-    name_lower = name.lower()
-    for folder in folders:
-        if folder["name"].lower() == name_lower:
-            return folder["path"]
-    return None
+    return _linked_folder_paths().get(name.lower())
 
 
 def add_linked_folder(name, path):
@@ -190,4 +362,4 @@ def is_linked_folder(name):
     Returns:
         bool: True if name matches a linked folder
     """
-    return name.lower() in get_all_linked_names()
+    return name.lower() in _linked_folder_paths()
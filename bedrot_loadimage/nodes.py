@@ -7,6 +7,7 @@ Images are stored in ComfyUI/input/BedRot_custom_image_load/{group}/
 
 import os
 import hashlib
+from collections import OrderedDict
 import numpy as np
 import torch
 from PIL import Image, ImageOps, ImageSequence
@@ -17,13 +18,23 @@ import node_helpers
 from .config import (
     load_linked_folders,
     get_linked_folder_path,
-    is_linked_folder
+    is_linked_folder,
+    cached_image_files,
+    get_local_group_names
 )
 
 # Constants - must match routes.py
 BASE_FOLDER = "BedRot_custom_image_load"
 DEFAULT_GROUP = "Unsorted"
 
+# Base path whose folder structure _ensure_base_structure has created
+_base_path_ready = None
+
+# Content hashes for IS_CHANGED: path -> ((st_mtime_ns, st_size), hexdigest),
+# least recently used first
+FILE_HASH_CACHE_SIZE = 1024
+_file_hash_cache = OrderedDict()
+
 
 def _get_base_path():
     """Get the base path for BedRot image storage."""
@@ -31,13 +42,28 @@ def _get_base_path():
 
 
 def _ensure_base_structure():
-    """Ensure the base folder structure exists."""
+    """
+    Ensure the base folder structure exists.
+
+    The folders are created once per base path; later calls skip the
+    makedirs syscalls.
+    """
+    global _base_path_ready
     base_path = _get_base_path()
-    unsorted_path = os.path.join(base_path, DEFAULT_GROUP)
-    os.makedirs(unsorted_path, exist_ok=True)
+    if base_path != _base_path_ready:
+        unsorted_path = os.path.join(base_path, DEFAULT_GROUP)
+        os.makedirs(unsorted_path, exist_ok=True)
+        _base_path_ready = base_path
     return base_path
 
 
+def _recreate_base_structure():
+    """Create the base folder structure again after finding it missing."""
+    global _base_path_ready
+    _base_path_ready = None
+    return _ensure_base_structure()
+
+
 def _resolve_group_path(group):
     """
     Resolve a group name to its absolute filesystem path.
@@ -59,19 +85,36 @@ def _resolve_group_path(group):
         return path, False
 
 
+def _is_within(path, folder):
+    """
+    Check that path stays inside folder after normalization.
+
+    A prefix test against the folder plus a trailing separator is
+    equivalent to comparing os.path.commonpath with the folder, without
+    splitting and rejoining both paths.
+    """
+    path = os.path.abspath(path)
+    folder = os.path.abspath(folder)
+    return path == folder or path.startswith(os.path.join(folder, ''))
+
+
 def _get_groups():
     """Get list of available groups (local subdirectories + linked folders)."""
-    base_path = _ensure_base_structure()
-
-    groups = []
+    _ensure_base_structure()
 
-    # Local groups (subdirectories)
+    # Local groups (subdirectories), rescanned only when the base folder's
+    # mtime changes, i.e. when a group is created, renamed or deleted
     try:
-        for entry in os.scandir(base_path):
-            if entry.is_dir():
-                groups.append(entry.name)
+        groups = list(get_local_group_names())
+    except FileNotFoundError:
+        # Base folder deleted while running: recreate it and retry once
+        try:
+            _recreate_base_structure()
+            groups = list(get_local_group_names())
+        except OSError:
+            groups = []
     except OSError:
-        pass
+        groups = []
 
     # Linked folders (from config)
     linked_folders = load_linked_folders()
@@ -94,18 +137,79 @@ def _get_images_in_group(group):
     """Get list of image files in a specific group (local or linked)."""
     group_path, _ = _resolve_group_path(group)
 
-    if not group_path or not os.path.exists(group_path):
+    if not group_path:
         return ["[no images]"]
 
-    files = [f for f in os.listdir(group_path)
-             if os.path.isfile(os.path.join(group_path, f))]
-    images = folder_paths.filter_files_content_types(files, ["image"])
-    images.sort(key=str.lower)
-
+    images, _ = cached_image_files(group_path)
     if not images:
         return ["[no images]"]
 
-    return images
+    # The list is handed to ComfyUI as combo options; keep the cache private
+    return list(images)
+
+
+def _to_float_array(image, out=None):
+    """
+    Convert an 8-bit PIL image to a float32 array scaled to [0, 1].
+
+    np.asarray wraps the bytes from PIL's array interface without copying
+    (unlike np.array), so the pixels are copied once into a fresh float32
+    buffer, which is then divided in place instead of allocating a second
+    full-size array for the quotient.
+
+    Args:
+        image: 8-bit PIL image
+        out: Optional float32 array of matching shape to write into
+
+    Returns:
+        The float32 array (out, if given)
+    """
+    if out is None:
+        out = np.asarray(image).astype(np.float32)
+    else:
+        out[...] = np.asarray(image)
+    np.divide(out, 255.0, out=out)
+    return out
+
+
+def _alpha_to_mask(alpha):
+    """
+    Convert an 8-bit alpha channel to a ComfyUI mask (1 - alpha / 255).
+
+    The inversion reuses the buffer from _to_float_array, so the mask
+    costs a single float32 allocation.
+    """
+    mask = _to_float_array(alpha)
+    np.subtract(1.0, mask, out=mask)
+    return torch.from_numpy(mask)
+
+
+def _prepare_frame(i):
+    """
+    Apply EXIF orientation and convert a frame to 8-bit RGB.
+
+    Returns:
+        tuple: (oriented frame, RGB frame) - the oriented frame still
+               carries the alpha channel for _frame_mask
+    """
+    i = node_helpers.pillow(ImageOps.exif_transpose, i)
+
+    if i.mode == 'I':
+        # Pillow calls a point() function on 'I' images only once, with a
+        # symbolic argument, to extract scale/offset; the transform itself
+        # runs in C (faster than the equivalent NumPy clip/divide)
+        i = i.point(lambda x: x * (1 / 255))
+    return i, i.convert("RGB")
+
+
+def _frame_mask(i):
+    """Extract the mask from a frame's alpha channel, or a blank 64x64 one."""
+    if 'A' in i.getbands():
+        return _alpha_to_mask(i.getchannel('A'))
+    if i.mode == 'P' and 'transparency' in i.info:
+        return _alpha_to_mask(i.convert('RGBA').getchannel('A'))
+    # Always a fresh tensor: downstream nodes may modify outputs in place
+    return torch.zeros((64, 64), dtype=torch.float32, device="cpu")
 
 
 class BedrotLoadImage:
@@ -161,10 +265,7 @@ class BedrotLoadImage:
         image_path = os.path.join(group_path, image)
 
         # Validate path stays within group folder (for both local and linked)
-        try:
-            if os.path.commonpath([os.path.abspath(image_path), os.path.abspath(group_path)]) != os.path.abspath(group_path):
-                raise ValueError(f"Invalid image path: {image}")
-        except ValueError:
+        if not _is_within(image_path, group_path):
             raise ValueError(f"Invalid image path: {image}")
 
         if not os.path.exists(image_path):
@@ -173,47 +274,49 @@ class BedrotLoadImage:
         # Load image using the same pattern as ComfyUI's LoadImage
         img = node_helpers.pillow(Image.open, image_path)
 
-        output_images = []
+        excluded_formats = ['MPO']
+
+        # Only the first frame of excluded formats is used
+        if img.format in excluded_formats:
+            n_frames = 1
+        else:
+            n_frames = getattr(img, "n_frames", None)
+
+        # Formats without n_frames (JPEG, BMP...) can't seek and always
+        # have a single frame
+        if n_frames is None or n_frames == 1:
+            # Static image (the common case): skip the sequence iterator
+            # and the batch bookkeeping
+            i, frame = _prepare_frame(img)
+            output_image = torch.from_numpy(_to_float_array(frame)[None])
+            return (output_image, _frame_mask(i).unsqueeze(0), image)
+
+        output_images = None
         output_masks = []
+        count = 0
         w, h = None, None
 
-        excluded_formats = ['MPO']
-
         for i in ImageSequence.Iterator(img):
-            i = node_helpers.pillow(ImageOps.exif_transpose, i)
-
-            if i.mode == 'I':
-                i = i.point(lambda x: x * (1 / 255))
-            frame = i.convert("RGB")
+            i, frame = _prepare_frame(i)
 
-            if len(output_images) == 0:
+            if count == 0:
                 w = frame.size[0]
                 h = frame.size[1]
+                # Frames are written straight into one preallocated batch
+                # instead of being concatenated at the end
+                output_images = np.empty((n_frames, h, w, 3), dtype=np.float32)
 
             if frame.size[0] != w or frame.size[1] != h:
                 continue
 
-            frame_np = np.array(frame).astype(np.float32) / 255.0
-            frame_tensor = torch.from_numpy(frame_np)[None,]
+            _to_float_array(frame, out=output_images[count])
+            output_masks.append(_frame_mask(i).unsqueeze(0))
+            count += 1
 
-            # Extract mask from alpha channel
-            if 'A' in i.getbands():
-                mask = np.array(i.getchannel('A')).astype(np.float32) / 255.0
-                mask = 1. - torch.from_numpy(mask)
-            elif i.mode == 'P' and 'transparency' in i.info:
-                mask = np.array(i.convert('RGBA').getchannel('A')).astype(np.float32) / 255.0
-                mask = 1. - torch.from_numpy(mask)
-            else:
-                mask = torch.zeros((64, 64), dtype=torch.float32, device="cpu")
-
-            output_images.append(frame_tensor)
-            output_masks.append(mask.unsqueeze(0))
-
-        if len(output_images) > 1 and img.format not in excluded_formats:
-            output_image = torch.cat(output_images, dim=0)
+        output_image = torch.from_numpy(output_images[:count])
+        if count > 1:
             output_mask = torch.cat(output_masks, dim=0)
         else:
-            output_image = output_images[0]
             output_mask = output_masks[0]
 
         return (output_image, output_mask, image)
@@ -230,13 +333,29 @@ class BedrotLoadImage:
 
         image_path = os.path.join(group_path, image)
 
-        if not os.path.exists(image_path):
+        try:
+            st = os.stat(image_path)
+        except OSError:
             return ""
 
+        # Rehash only when the file was modified since the last check
+        key = (st.st_mtime_ns, st.st_size)
+        cached = _file_hash_cache.get(image_path)
+        if cached is not None and cached[0] == key:
+            _file_hash_cache.move_to_end(image_path)
+            return cached[1]
+
+        # Stream in 1 MB chunks instead of reading the whole file into memory
         m = hashlib.sha256()
         with open(image_path, 'rb') as f:
-            m.update(f.read())
-        return m.digest().hex()
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                m.update(chunk)
+        digest = m.digest().hex()
+        _file_hash_cache[image_path] = (key, digest)
+        _file_hash_cache.move_to_end(image_path)
+        if len(_file_hash_cache) > FILE_HASH_CACHE_SIZE:
+            _file_hash_cache.popitem(last=False)
+        return digest
 
     @classmethod
     def VALIDATE_INPUTS(cls, group, image):
@@ -251,10 +370,7 @@ class BedrotLoadImage:
         image_path = os.path.join(group_path, image)
 
         # Security check - path must stay within group folder
-        try:
-            if os.path.commonpath([os.path.abspath(image_path), os.path.abspath(group_path)]) != os.path.abspath(group_path):
-                return f"Invalid image path: {image}"
-        except ValueError:
+        if not _is_within(image_path, group_path):
             return f"Invalid image path: {image}"
 
         if not os.path.exists(image_path):
@@ -7,23 +7,49 @@ Custom endpoints for group-based image management.
 from server import PromptServer
 from aiohttp import web
 import folder_paths
+import asyncio
+import functools
+import hashlib
+import json
 import os
+import re
 import shutil
-import hashlib
+import uuid
 from urllib.parse import unquote
 
+try:
+    # Optional: much faster encoder for large listings
+    import orjson
+except ImportError:
+    orjson = None
+
 from .config import (
     load_linked_folders,
     add_linked_folder,
     remove_linked_folder,
     get_linked_folder_path,
-    is_linked_folder
+    is_linked_folder,
+    cached_image_files,
+    invalidate_listings
 )
 
 # Constants
 BASE_FOLDER = "BedRot_custom_image_load"
 DEFAULT_GROUP = "Unsorted"
 
+# Base path whose folder structure _ensure_base_structure has created
+_base_path_ready = None
+
+# Windows folder picker: IFileOpenDialog class/interface IDs and flags
+_CLSID_FILE_OPEN_DIALOG = "{DC1C5A9C-E88A-4DDE-A5A1-60F82A20AEF7}"
+_IID_FILE_OPEN_DIALOG = "{D57C7288-D4AD-4768-BE02-9D969532D960}"
+_FOS_PICKFOLDERS = 0x20
+_FOS_FORCEFILESYSTEM = 0x40
+_SIGDN_FILESYSPATH = 0x80058000
+
+# Names with no separators or drive colons, which normpath leaves as is
+_PLAIN_NAME_RE = re.compile(r'[^/\\:]+')
+
 
 def _get_base_path():
     """Get the base path for BedRot image storage."""
@@ -34,10 +60,18 @@ def _sanitize_path(name):
     """
     Sanitize user-provided path component to prevent directory traversal.
     Returns cleaned name or raises ValueError if invalid.
+
+    The result is relative and has no '..' components, so joining it onto
+    a folder always stays inside that folder; routes rely on this instead
+    of re-validating the joined path.
     """
     if not name or not isinstance(name, str):
         raise ValueError("Invalid path: empty or not a string")
 
+    # Plain group and file names come back unchanged from the steps below
+    if _PLAIN_NAME_RE.fullmatch(name) and ".." not in name and name != ".":
+        return name
+
     # Normalize and strip dangerous characters
     clean = os.path.normpath(name).replace("\\", "/")
 
@@ -56,28 +90,101 @@ def _sanitize_path(name):
 
 
 def _ensure_base_structure():
-    """Ensure the base folder structure exists with default Unsorted group."""
+    """
+    Ensure the base folder structure exists with default Unsorted group.
+
+    The folders are created once per base path; later calls skip the
+    makedirs syscalls.
+    """
+    global _base_path_ready
     base_path = _get_base_path()
-    unsorted_path = os.path.join(base_path, DEFAULT_GROUP)
-    os.makedirs(unsorted_path, exist_ok=True)
+    if base_path != _base_path_ready:
+        unsorted_path = os.path.join(base_path, DEFAULT_GROUP)
+        os.makedirs(unsorted_path, exist_ok=True)
+        _base_path_ready = base_path
     return base_path
 
 
-def _get_image_files(directory):
-    """Get list of image files in a directory."""
-    if not os.path.exists(directory):
-        return []
+def _recreate_base_structure():
+    """Create the base folder structure again after finding it missing."""
+    global _base_path_ready
+    _base_path_ready = None
+    return _ensure_base_structure()
+
+
+def _make_etag(data):
+    """Make a strong ETag from response bytes."""
+    return '"%s"' % hashlib.blake2b(data, digest_size=8).hexdigest()
 
-    files = [f for f in os.listdir(directory)
-             if os.path.isfile(os.path.join(directory, f))]
-    return folder_paths.filter_files_content_types(files, ["image"])
+
+def _count_image_files(directory):
+    """Count the image files in a directory without copying the listing."""
+    return len(cached_image_files(directory)[0])
+
+
+def _dumps(payload):
+    """Serialize a response payload to JSON bytes, via orjson if installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload)
+        except TypeError:
+            # orjson rejects surrogates from undecodable file names
+            pass
+    return json.dumps(payload).encode("utf-8")
+
+
+def _etag_matches(request, etag):
+    """Check whether the request's If-None-Match covers an ETag."""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    return any(tag.strip().removeprefix("W/") in (etag, "*")
+               for tag in header.split(","))
+
+
+def _cached_json_response(request, payload, etag=None):
+    """
+    JSON response carrying an ETag, or 304 Not Modified if the client
+    already has that version.
+
+    Without an ETag one is derived from the serialized body, which still
+    saves the transfer; with one, an unchanged listing skips
+    serialization too.
+    """
+    body = None
+    if etag is None:
+        body = _dumps(payload)
+        etag = _make_etag(body)
+
+    # no-cache: clients may store the response but must revalidate
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return web.Response(status=304, headers=headers)
+
+    if body is None:
+        body = _dumps(payload)
+    return web.Response(body=body, content_type="application/json", headers=headers)
+
+
+@functools.lru_cache(maxsize=64)
+def _base_prefix(base_path):
+    """Absolute form of a base path, and that form with a trailing separator."""
+    base_abs = os.path.abspath(base_path)
+    return base_abs, os.path.join(base_abs, '')
 
 
 def _validate_path_within_base(target_path, base_path):
-    """Validate that target path is within the base path."""
+    """
+    Validate that target path is within the base path.
+
+    Equivalent to comparing os.path.commonpath with the base, as a prefix
+    test against the base plus a trailing separator. Bases repeat across
+    requests, so their normalized forms are cached.
+    """
     target_abs = os.path.abspath(target_path)
-    base_abs = os.path.abspath(base_path)
-    return os.path.commonpath([target_abs, base_abs]) == base_abs
+    base_abs, base_sep = _base_prefix(base_path)
+    return target_abs == base_abs or target_abs.startswith(base_sep)
 
 
 def _resolve_group_path(group):
@@ -87,21 +194,157 @@ def _resolve_group_path(group):
     Args:
         group: Group name (could be local or linked)
 
+    Local group paths are validated here to lie within the base folder,
+    so routes only need to sanitize names they join onto the result.
+
     Returns:
-        tuple: (path: str, is_linked: bool, validation_base: str)
-               validation_base is the folder to validate paths against
+        tuple: (path: str, is_linked: bool) or (None, False) if invalid
     """
     if is_linked_folder(group):
         path = get_linked_folder_path(group)
         if path and os.path.isdir(path):
-            return path, True, path
-        return None, False, None
+            return path, True
+        return None, False
     else:
         base_path = _get_base_path()
         path = os.path.join(base_path, group)
+        if not _validate_path_within_base(path, base_path):
+            return None, False
         return path, False, base_path
 
 
+def _same_contents(f1, f2):
+    """
+    Compare two file objects chunk by chunk from their current positions.
+
+    Stops at the first differing 1 MB chunk, so files that differ early
+    are barely read.
+    """
+    while True:
+        chunk1 = f1.read(1 << 20)
+        chunk2 = f2.read(1 << 20)
+        if chunk1 != chunk2:
+            return False
+        if not chunk1:
+            return True
+
+
+def _save_upload(upload, group_path, filename):
+    """
+    Save an uploaded file into a group folder, skipping exact duplicates.
+
+    Blocking (reads, hashes and writes files); the upload route runs it in
+    a worker thread. The upload is streamed rather than read into memory:
+    its size comes from seeking, it is only compared against existing
+    files of the same size, and it is copied to disk in chunks.
+
+    Args:
+        upload: Seekable file object with the uploaded data
+        group_path: Folder to save into
+        filename: Requested file name
+
+    Returns:
+        tuple: (filename: str, duplicate: bool) - the name the data is
+               stored under, and whether an identical file already existed
+    """
+    start = upload.tell()
+    new_size = upload.seek(0, os.SEEK_END) - start
+    upload.seek(start)
+
+    # Handle duplicates - add number suffix if needed
+    split = os.path.splitext(filename)
+    filepath = os.path.join(group_path, filename)
+    i = 1
+    while True:
+        # One stat both checks for an existing file and gets its size
+        try:
+            existing_size = os.stat(filepath).st_size
+        except FileNotFoundError:
+            # Exclusive create: a concurrent upload may claim the same name
+            # between the check and the write
+            try:
+                with open(filepath, "xb") as f:
+                    shutil.copyfileobj(upload, f, 1 << 20)
+                return filename, False
+            except FileExistsError:
+                # Taken meanwhile (or a dangling symlink): try the next name
+                pass
+        else:
+            # Check if it's the same file. Files of a different size can't
+            # match, so only same-size candidates are read and compared
+            if existing_size == new_size:
+                with open(filepath, "rb") as f:
+                    same = _same_contents(upload, f)
+                upload.seek(start)
+
+                if same:
+                    # Same file, just return existing
+                    return filename, True
+
+        # Different file, increment suffix
+        filename = f"{split[0]} ({i}){split[1]}"
+        filepath = os.path.join(group_path, filename)
+        i += 1
+
+
+def _copy_image_file(src_path, dst_dir, filename):
+    """
+    Copy a file's contents into a folder under a free name.
+
+    The destination is created exclusively, adding a number suffix while
+    the name is taken, so there is no separate existence check that a
+    concurrent copy or upload could race. Metadata (mode, timestamps) is
+    not copied.
+
+    Tries os.copy_file_range first, which keeps the copy inside the kernel
+    and lets filesystems such as Btrfs and XFS share extents (reflink)
+    instead of duplicating the data. Falls back to a chunked copy where it
+    is unavailable or unsupported between the two files.
+
+    Returns:
+        str: The file name the copy was stored under
+    """
+    split = os.path.splitext(filename)
+    i = 1
+    with open(src_path, "rb") as fsrc:
+        while True:
+            dst_path = os.path.join(dst_dir, filename)
+            try:
+                fdst = open(dst_path, "xb")
+            except FileExistsError:
+                filename = f"{split[0]} ({i}){split[1]}"
+                i += 1
+                continue
+            break
+
+        try:
+            with fdst:
+                if hasattr(os, "copy_file_range"):
+                    try:
+                        remaining = os.fstat(fsrc.fileno()).st_size
+                        while remaining > 0:
+                            copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                            if copied == 0:
+                                break
+                            remaining -= copied
+                        return filename
+                    except OSError:
+                        # EXDEV, ENOSYS, EOPNOTSUPP...; rewrite dst from scratch
+                        fsrc.seek(0)
+                        fdst.seek(0)
+                        fdst.truncate()
+
+                shutil.copyfileobj(fsrc, fdst, 1 << 20)
+                return filename
+        except OSError:
+            # Don't leave a partial copy behind
+            try:
+                os.remove(dst_path)
+            except OSError:
+                pass
+            raise
+
+
 # Ensure base structure exists on module import
 _ensure_base_structure()
 
@@ -115,26 +358,48 @@ async def list_groups(request):
     groups = []
 
     # Local groups (subdirectories)
+    def scan_local_groups():
+        with os.scandir(base_path) as entries:
+            return [entry.path for entry in entries if entry.is_dir()]
+
     try:
-        for entry in os.scandir(base_path):
-            if entry.is_dir():
-                images = _get_image_files(entry.path)
-                groups.append({
-                    "name": entry.name,
-                    "count": len(images),
-                    "type": "local"
-                })
+        try:
+            local_paths = scan_local_groups()
+        except FileNotFoundError:
+            # Base folder deleted while running: recreate it and retry once
+            _recreate_base_structure()
+            local_paths = scan_local_groups()
     except OSError as e:
         return web.json_response({"error": str(e)}, status=500)
 
-    # Linked folders
+    def linked_count(path):
+        """Image count of a linked folder, or None if it no longer exists."""
+        if not os.path.isdir(path):
+            return None
+        return _count_image_files(path)
+
+    # Count images in worker threads, so directory stats and uncached
+    # scans (possibly on network drives) run in parallel and off the
+    # event loop
     linked_folders = load_linked_folders()
-    for folder in linked_folders:
-        if os.path.isdir(folder["path"]):
-            images = _get_image_files(folder["path"])
+    counts = await asyncio.gather(
+        *(asyncio.to_thread(_count_image_files, path) for path in local_paths),
+        *(asyncio.to_thread(linked_count, folder["path"]) for folder in linked_folders)
+    )
+
+    for path, count in zip(local_paths, counts):
+        groups.append({
+            "name": os.path.basename(path),
+            "count": count,
+            "type": "local"
+        })
+
+    # Linked folders
+    for folder, count in zip(linked_folders, counts[len(local_paths):]):
+        if count is not None:
             groups.append({
                 "name": folder["name"],
-                "count": len(images),
+                "count": count,
                 "type": "linked",
                 "path": folder["path"]
             })
@@ -142,7 +407,7 @@ async def list_groups(request):
     # Sort groups, but keep Unsorted first
     groups.sort(key=lambda g: (g["name"] != DEFAULT_GROUP, g["name"].lower()))
 
-    return web.json_response(groups)
+    return _cached_json_response(request, groups)
 
 
 @PromptServer.instance.routes.get("/bedrot/images/{group}")
@@ -152,7 +417,7 @@ async def list_images(request):
     group = unquote(group_raw)
 
     # Try to resolve as linked folder first
-    group_path, is_linked, validation_base = _resolve_group_path(group)
+    group_path, _ = _resolve_group_path(group)
 
     if group_path is None:
         # Not a linked folder, try as local group with sanitization
@@ -160,20 +425,15 @@ async def list_images(request):
             sanitized = _sanitize_path(group)
             base_path = _get_base_path()
             group_path = os.path.join(base_path, sanitized)
-            validation_base = base_path
         except ValueError as e:
             return web.json_response({"error": str(e)}, status=400)
 
-    if not is_linked and not _validate_path_within_base(group_path, validation_base):
-        return web.json_response({"error": "Invalid group path"}, status=400)
-
     if not os.path.exists(group_path):
         return web.json_response([])
 
-    images = _get_image_files(group_path)
-    images.sort(key=str.lower)
+    images, etag = await asyncio.to_thread(cached_image_files, group_path)
 
-    return web.json_response(images)
+    return _cached_json_response(request, images, etag)
 
 
 @PromptServer.instance.routes.post("/bedrot/upload/image")
@@ -188,7 +448,7 @@ async def bedrot_upload_image(request):
     group = post.get("group", DEFAULT_GROUP)
 
     # Try to resolve as linked folder first
-    group_path, is_linked, validation_base = _resolve_group_path(group)
+    group_path, is_linked = _resolve_group_path(group)
 
     if group_path is None:
         # Not a linked folder, try as local group
@@ -196,19 +456,14 @@ async def bedrot_upload_image(request):
             sanitized = _sanitize_path(group)
             base_path = _get_base_path()
             group_path = os.path.join(base_path, sanitized)
-            validation_base = base_path
             is_linked = False
         except ValueError:
             # Fall back to default group
             base_path = _get_base_path()
             group_path = os.path.join(base_path, DEFAULT_GROUP)
-            validation_base = base_path
             is_linked = False
             group = DEFAULT_GROUP
 
-    if not is_linked and not _validate_path_within_base(group_path, validation_base):
-        return web.json_response({"error": "Invalid group path"}, status=400)
-
     # Create group folder if needed (local only - linked folders should exist)
     if not is_linked:
         os.makedirs(group_path, exist_ok=True)
@@ -224,45 +479,22 @@ async def bedrot_upload_image(request):
     if not _validate_path_within_base(filepath, group_path):
         return web.json_response({"error": "Invalid file path"}, status=400)
 
-    # Handle duplicates - add number suffix if needed
-    split = os.path.splitext(filename)
-    i = 1
-    while os.path.exists(filepath):
-        # Check if it's the same file by hash
-        hasher_existing = hashlib.sha256()
-        hasher_new = hashlib.sha256()
-
-        with open(filepath, "rb") as f:
-            hasher_existing.update(f.read())
-
-        hasher_new.update(image.file.read())
-        image.file.seek(0)
-
-        if hasher_existing.hexdigest() == hasher_new.hexdigest():
-            # Same file, just return existing
-            subfolder = group if is_linked else f"{BASE_FOLDER}/{group}"
-            return web.json_response({
-                "name": filename,
-                "subfolder": subfolder,
-                "type": "linked" if is_linked else "input",
-                "duplicate": True
-            })
-
-        # Different file, increment suffix
-        filename = f"{split[0]} ({i}){split[1]}"
-        filepath = os.path.join(group_path, filename)
-        i += 1
-
-    # Save the file
-    with open(filepath, "wb") as f:
-        f.write(image.file.read())
+    # Hashing and disk I/O run in a worker thread so a large upload
+    # doesn't stall the event loop for every other request
+    filename, duplicate = await asyncio.to_thread(
+        _save_upload, image.file, group_path, filename
+    )
+    invalidate_listings(group_path)
 
     subfolder = group if is_linked else f"{BASE_FOLDER}/{group}"
-    return web.json_response({
+    response = {
         "name": filename,
         "subfolder": subfolder,
         "type": "linked" if is_linked else "input"
-    })
+    }
+    if duplicate:
+        response["duplicate"] = True
+    return web.json_response(response)
 
 
 @PromptServer.instance.routes.post("/bedrot/group/create")
@@ -281,9 +513,6 @@ async def create_group(request):
     base_path = _get_base_path()
     group_path = os.path.join(base_path, name)
 
-    if not _validate_path_within_base(group_path, base_path):
-        return web.json_response({"error": "Invalid group path"}, status=400)
-
     if os.path.exists(group_path):
         return web.json_response({"error": "Group already exists"}, status=409)
 
@@ -291,6 +520,7 @@ async def create_group(request):
         os.makedirs(group_path)
     except OSError as e:
         return web.json_response({"error": str(e)}, status=500)
+    invalidate_listings(group_path)
 
     return web.json_response({"success": True, "name": name})
 
@@ -326,12 +556,6 @@ async def rename_group(request):
     old_path = os.path.join(base_path, old_name)
     new_path = os.path.join(base_path, new_name)
 
-    if not _validate_path_within_base(old_path, base_path):
-        return web.json_response({"error": "Invalid source path"}, status=400)
-
-    if not _validate_path_within_base(new_path, base_path):
-        return web.json_response({"error": "Invalid destination path"}, status=400)
-
     if not os.path.exists(old_path):
         return web.json_response({"error": "Source group does not exist"}, status=404)
 
@@ -339,9 +563,10 @@ async def rename_group(request):
         return web.json_response({"error": "Destination group already exists"}, status=409)
 
     try:
-        os.rename(old_path, new_path)
+        await asyncio.to_thread(os.rename, old_path, new_path)
     except OSError as e:
         return web.json_response({"error": str(e)}, status=500)
+    invalidate_listings(old_path, new_path)
 
     return web.json_response({"success": True, "old_name": old_name, "new_name": new_name})
 
@@ -365,38 +590,28 @@ async def copy_image_to_group(request):
         return web.json_response({"error": str(e)}, status=400)
 
     # Resolve source group
-    src_group_path, src_linked, src_base = _resolve_group_path(src_group)
+    src_group_path, _ = _resolve_group_path(src_group)
     if src_group_path is None:
         try:
             sanitized = _sanitize_path(src_group)
             base_path = _get_base_path()
             src_group_path = os.path.join(base_path, sanitized)
-            src_base = base_path
         except ValueError as e:
             return web.json_response({"error": f"Invalid source: {e}"}, status=400)
 
     # Resolve destination group
-    dst_group_path, dst_linked, dst_base = _resolve_group_path(dst_group)
+    dst_group_path, dst_linked = _resolve_group_path(dst_group)
     if dst_group_path is None:
         try:
             sanitized = _sanitize_path(dst_group)
             base_path = _get_base_path()
             dst_group_path = os.path.join(base_path, sanitized)
-            dst_base = base_path
             dst_linked = False
         except ValueError as e:
             return web.json_response({"error": f"Invalid destination: {e}"}, status=400)
 
     src_path = os.path.join(src_group_path, image_name)
     dst_dir = dst_group_path
-    dst_path = os.path.join(dst_dir, image_name)
-
-    # Validate paths
-    if not _validate_path_within_base(src_path, src_group_path):
-        return web.json_response({"error": "Invalid source path"}, status=400)
-
-    if not _validate_path_within_base(dst_path, dst_group_path):
-        return web.json_response({"error": "Invalid destination path"}, status=400)
 
     if not os.path.exists(src_path):
         return web.json_response({"error": "Source image does not exist"}, status=404)
@@ -407,20 +622,14 @@ async def copy_image_to_group(request):
     elif not os.path.exists(dst_dir):
         return web.json_response({"error": "Destination linked folder no longer exists"}, status=400)
 
-    # Handle name collision in destination
-    final_name = image_name
-    if os.path.exists(dst_path):
-        split = os.path.splitext(image_name)
-        i = 1
-        while os.path.exists(dst_path):
-            final_name = f"{split[0]} ({i}){split[1]}"
-            dst_path = os.path.join(dst_dir, final_name)
-            i += 1
-
+    # Name collisions in the destination get a number suffix
     try:
-        shutil.copy2(src_path, dst_path)
+        final_name = await asyncio.to_thread(
+            _copy_image_file, src_path, dst_dir, image_name
+        )
     except OSError as e:
         return web.json_response({"error": str(e)}, status=500)
+    invalidate_listings(dst_dir)
 
     return web.json_response({
         "success": True,
@@ -459,14 +668,11 @@ async def delete_group(request):
     base_path = _get_base_path()
     group_path = os.path.join(base_path, name)
 
-    if not _validate_path_within_base(group_path, base_path):
-        return web.json_response({"error": "Invalid group path"}, status=400)
-
     if not os.path.exists(group_path):
         return web.json_response({"error": "Group does not exist"}, status=404)
 
     # Check if empty
-    contents = os.listdir(group_path)
+    contents = await asyncio.to_thread(os.listdir, group_path)
     if contents and not force:
         return web.json_response({
             "error": "Group is not empty. Use force=true to delete anyway.",
@@ -475,11 +681,12 @@ async def delete_group(request):
 
     try:
         if force:
-            shutil.rmtree(group_path)
+            await asyncio.to_thread(shutil.rmtree, group_path)
         else:
-            os.rmdir(group_path)
+            await asyncio.to_thread(os.rmdir, group_path)
     except OSError as e:
         return web.json_response({"error": str(e)}, status=500)
+    invalidate_listings(group_path)
 
     return web.json_response({"success": True, "name": name})
 
@@ -502,21 +709,17 @@ async def delete_image(request):
         return web.json_response({"error": str(e)}, status=400)
 
     # Resolve group
-    group_path, is_linked, validation_base = _resolve_group_path(group)
+    group_path, _ = _resolve_group_path(group)
     if group_path is None:
         try:
             sanitized = _sanitize_path(group)
             base_path = _get_base_path()
             group_path = os.path.join(base_path, sanitized)
-            validation_base = base_path
         except ValueError as e:
             return web.json_response({"error": str(e)}, status=400)
 
     image_path = os.path.join(group_path, image_name)
 
-    if not _validate_path_within_base(image_path, group_path):
-        return web.json_response({"error": "Invalid image path"}, status=400)
-
     if not os.path.exists(image_path):
         return web.json_response({"error": "Image does not exist"}, status=404)
 
@@ -524,6 +727,7 @@ async def delete_image(request):
         os.remove(image_path)
     except OSError as e:
         return web.json_response({"error": str(e)}, status=500)
+    invalidate_listings(group_path)
 
     return web.json_response({"success": True, "image": image_name, "group": group})
 
@@ -537,19 +741,24 @@ async def list_linked_folders(request):
     """List all linked folders with their paths and status."""
     folders = load_linked_folders()
 
-    result = []
-    for folder in folders:
+    def folder_status(folder):
         exists = os.path.isdir(folder["path"])
         image_count = 0
         if exists:
-            image_count = len(_get_image_files(folder["path"]))
+            image_count = _count_image_files(folder["path"])
 
-        result.append({
+        return {
             "name": folder["name"],
             "path": folder["path"],
             "exists": exists,
             "count": image_count
-        })
+        }
+
+    # Linked folders may sit on slow or network drives; check them in
+    # parallel worker threads
+    result = await asyncio.gather(
+        *(asyncio.to_thread(folder_status, folder) for folder in folders)
+    )
 
     return web.json_response(result)
 
@@ -599,168 +808,169 @@ async def remove_linked_folder_endpoint(request):
         return web.json_response({"error": message}, status=404)
 
 
-@PromptServer.instance.routes.post("/bedrot/browse/folder")
-async def browse_for_folder(request):
-    """Open native Windows folder picker and register selected folder as a group."""
-    import ctypes
-    from ctypes import wintypes
-    import asyncio
+def _open_folder_dialog():
+    """
+    Open modern Windows File Explorer folder picker using IFileOpenDialog.
 
-    def open_folder_dialog():
-        """Open modern Windows File Explorer folder picker using IFileOpenDialog."""
-        try:
-            from ctypes import windll, byref, c_void_p, c_ulong, c_wchar_p, POINTER, WINFUNCTYPE
-            import comtypes.client
+    Blocking (waits for the user); run it in a worker thread.
+
+    Returns:
+        str or None: Selected folder path, or None if cancelled or failed
+    """
+    try:
+        import comtypes.client
 
-            # Use comtypes for clean COM interface access
-            from comtypes.shelllink import IShellItem
-            from comtypes import GUID, CoCreateInstance, CLSCTX_INPROC_SERVER
+        # Use comtypes for clean COM interface access
+        from comtypes.shelllink import IShellItem  # noqa: F401 (registers the interface)
+        from comtypes import GUID, CoCreateInstance, CLSCTX_INPROC_SERVER
 
-            # IFileOpenDialog GUID
-            CLSID_FileOpenDialog = GUID("{DC1C5A9C-E88A-4DDE-A5A1-60F82A20AEF7}")
+        # Create dialog
+        file_dialog = CoCreateInstance(
+            GUID(_CLSID_FILE_OPEN_DIALOG),
+            None,
+            CLSCTX_INPROC_SERVER,
+            comtypes.client.CreateObject
+        )
 
-            # File dialog options
-            FOS_PICKFOLDERS = 0x20
-            FOS_FORCEFILESYSTEM = 0x40
+        # Set folder picker option
+        options = file_dialog.GetOptions()
+        file_dialog.SetOptions(options | _FOS_PICKFOLDERS | _FOS_FORCEFILESYSTEM)
 
-            # Create dialog
-            file_dialog = CoCreateInstance(
-                CLSID_FileOpenDialog,
-                None,
-                CLSCTX_INPROC_SERVER,
-                comtypes.client.CreateObject
-            )
+        # Show dialog
+        hr = file_dialog.Show(None)
 
-            # Set folder picker option
-            options = file_dialog.GetOptions()
-            file_dialog.SetOptions(options | FOS_PICKFOLDERS | FOS_FORCEFILESYSTEM)
+        if hr != 0:
+            return None
 
-            # Show dialog
-            hr = file_dialog.Show(None)
+        # Get result
+        result = file_dialog.GetResult()
+        folder_path = result.GetDisplayName(_SIGDN_FILESYSPATH)
 
-            if hr != 0:
-                return None
+        return folder_path
 
-            # Get result
-            result = file_dialog.GetResult()
-            folder_path = result.GetDisplayName(0x80058000)  # SIGDN_FILESYSPATH
+    except ImportError:
+        # Fallback: use ctypes directly if comtypes not available
+        pass
+    except Exception as e:
+        print(f"[BEDROT LoadImage] Folder dialog (comtypes) error: {e}")
 
-            return folder_path
+    # Fallback implementation using pure ctypes
+    try:
+        from ctypes import windll, byref, c_void_p, c_ulong, c_wchar_p, POINTER, cast
 
-        except ImportError:
-            # Fallback: use ctypes directly if comtypes not available
-            pass
-        except Exception as e:
-            print(f"[BEDROT LoadImage] Folder dialog (comtypes) error: {e}")
+        ole32 = windll.ole32
 
-        # Fallback implementation using pure ctypes
-        try:
-            from ctypes import windll, byref, c_void_p, c_ulong, POINTER, cast, create_unicode_buffer
-            import uuid
-
-            ole32 = windll.ole32
-            shell32 = windll.shell32
-
-            # Initialize COM
-            ole32.CoInitialize(None)
-
-            # GUIDs as bytes
-            CLSID_FileOpenDialog = uuid.UUID("{DC1C5A9C-E88A-4DDE-A5A1-60F82A20AEF7}").bytes_le
-            IID_IFileOpenDialog = uuid.UUID("{D57C7288-D4AD-4768-BE02-9D969532D960}").bytes_le
-
-            # File dialog options
-            FOS_PICKFOLDERS = 0x20
-            FOS_FORCEFILESYSTEM = 0x40
-
-            # Create FileOpenDialog
-            file_dialog = c_void_p()
-            hr = ole32.CoCreateInstance(
-                CLSID_FileOpenDialog,
-                None,
-                1,  # CLSCTX_INPROC_SERVER
-                IID_IFileOpenDialog,
-                byref(file_dialog)
-            )
-
-            if hr != 0 or not file_dialog:
-                ole32.CoUninitialize()
-                return None
-
-            # Get vtable pointer
-            vtable = cast(file_dialog, POINTER(c_void_p))[0]
-            vtable = cast(vtable, POINTER(c_void_p * 30))
-
-            # Define function types for COM methods
-            # IFileDialog vtable offsets:
-            # 0-2: IUnknown (QueryInterface, AddRef, Release)
-            # 3: Show
-            # 4: SetFileTypes
-            # 5: SetFileTypeIndex
-            # 6: GetFileTypeIndex
-            # 7: Advise
-            # 8: Unadvise
-            # 9: SetOptions
-            # 10: GetOptions
-            # ...
-            # 20: GetResult (for IFileOpenDialog)
-
-            GetOptions = ctypes.WINFUNCTYPE(ctypes.c_long, c_void_p, POINTER(c_ulong))(vtable.contents[10])
-            SetOptions = ctypes.WINFUNCTYPE(ctypes.c_long, c_void_p, c_ulong)(vtable.contents[9])
-            Show = ctypes.WINFUNCTYPE(ctypes.c_long, c_void_p, c_void_p)(vtable.contents[3])
-            GetResult = ctypes.WINFUNCTYPE(ctypes.c_long, c_void_p, POINTER(c_void_p))(vtable.contents[20])
-            Release = ctypes.WINFUNCTYPE(c_ulong, c_void_p)(vtable.contents[2])
-
-            # Get current options and add folder picker flag
-            options = c_ulong()
-            GetOptions(file_dialog, byref(options))
-            SetOptions(file_dialog, options.value | FOS_PICKFOLDERS | FOS_FORCEFILESYSTEM)
-
-            # Show the dialog
-            hr = Show(file_dialog, None)
-
-            folder_path = None
-            if hr == 0:
-                # Get the selected item
-                shell_item = c_void_p()
-                hr = GetResult(file_dialog, byref(shell_item))
-
-                if hr == 0 and shell_item:
-                    # Get IShellItem vtable
-                    item_vtable = cast(shell_item, POINTER(c_void_p))[0]
-                    item_vtable = cast(item_vtable, POINTER(c_void_p * 10))
-
-                    # IShellItem::GetDisplayName is at offset 5
-                    # SIGDN_FILESYSPATH = 0x80058000
-                    GetDisplayName = ctypes.WINFUNCTYPE(
-                        ctypes.c_long, c_void_p, c_ulong, POINTER(c_wchar_p)
-                    )(item_vtable.contents[5])
-
-                    path_ptr = c_wchar_p()
-                    hr = GetDisplayName(shell_item, 0x80058000, byref(path_ptr))
-
-                    if hr == 0 and path_ptr.value:
-                        folder_path = path_ptr.value
-                        ole32.CoTaskMemFree(path_ptr)
-
-                    # Release shell item
-                    ItemRelease = ctypes.WINFUNCTYPE(c_ulong, c_void_p)(item_vtable.contents[2])
-                    ItemRelease(shell_item)
-
-            # Release dialog
-            Release(file_dialog)
-            ole32.CoUninitialize()
+        # Initialize COM
+        ole32.CoInitialize(None)
 
-            return folder_path
+        # Create FileOpenDialog
+        file_dialog = c_void_p()
+        hr = ole32.CoCreateInstance(
+            uuid.UUID(_CLSID_FILE_OPEN_DIALOG).bytes_le,
+            None,
+            1,  # CLSCTX_INPROC_SERVER
+            uuid.UUID(_IID_FILE_OPEN_DIALOG).bytes_le,
+            byref(file_dialog)
+        )
 
-        except Exception as e:
-            print(f"[BEDROT LoadImage] Folder dialog error: {e}")
-            import traceback
-            traceback.print_exc()
+        if hr != 0 or not file_dialog:
+            ole32.CoUninitialize()
             return None
 
+        # Get vtable pointer
+        vtable = cast(file_dialog, POINTER(c_void_p))[0]
+        vtable = cast(vtable, POINTER(c_void_p * 30))
+
+        # IFileDialog vtable offsets:
+        # 0-2: IUnknown (QueryInterface, AddRef, Release)
+        # 3: Show
+        # 4: SetFileTypes
+        # 5: SetFileTypeIndex
+        # 6: GetFileTypeIndex
+        # 7: Advise
+        # 8: Unadvise
+        # 9: SetOptions
+        # 10: GetOptions
+        # ...
+        # 20: GetResult (for IFileOpenDialog)
+        prototypes = _com_prototypes()
+        GetOptions = prototypes["GetOptions"](vtable.contents[10])
+        SetOptions = prototypes["SetOptions"](vtable.contents[9])
+        Show = prototypes["Show"](vtable.contents[3])
+        GetResult = prototypes["GetResult"](vtable.contents[20])
+        Release = prototypes["Release"](vtable.contents[2])
+
+        # Get current options and add folder picker flag
+        options = c_ulong()
+        GetOptions(file_dialog, byref(options))
+        SetOptions(file_dialog, options.value | _FOS_PICKFOLDERS | _FOS_FORCEFILESYSTEM)
+
+        # Show the dialog
+        hr = Show(file_dialog, None)
+
+        folder_path = None
+        if hr == 0:
+            # Get the selected item
+            shell_item = c_void_p()
+            hr = GetResult(file_dialog, byref(shell_item))
+
+            if hr == 0 and shell_item:
+                # Get IShellItem vtable
+                item_vtable = cast(shell_item, POINTER(c_void_p))[0]
+                item_vtable = cast(item_vtable, POINTER(c_void_p * 10))
+
+                # IShellItem::GetDisplayName is at offset 5
+                GetDisplayName = prototypes["GetDisplayName"](item_vtable.contents[5])
+
+                path_ptr = c_wchar_p()
+                hr = GetDisplayName(shell_item, _SIGDN_FILESYSPATH, byref(path_ptr))
+
+                if hr == 0 and path_ptr.value:
+                    folder_path = path_ptr.value
+                    ole32.CoTaskMemFree(path_ptr)
+
+                # Release shell item
+                ItemRelease = prototypes["Release"](item_vtable.contents[2])
+                ItemRelease(shell_item)
+
+        # Release dialog
+        Release(file_dialog)
+        ole32.CoUninitialize()
+
+        return folder_path
+
+    except Exception as e:
+        print(f"[BEDROT LoadImage] Folder dialog error: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def _com_prototypes():
+    """
+    WINFUNCTYPE prototypes for the COM methods the ctypes picker calls.
+
+    Built once; each call binds them to the current object's vtable
+    entries. Windows only.
+    """
+    from ctypes import WINFUNCTYPE, c_long, c_ulong, c_void_p, c_wchar_p, POINTER
+
+    return {
+        "GetOptions": WINFUNCTYPE(c_long, c_void_p, POINTER(c_ulong)),
+        "SetOptions": WINFUNCTYPE(c_long, c_void_p, c_ulong),
+        "Show": WINFUNCTYPE(c_long, c_void_p, c_void_p),
+        "GetResult": WINFUNCTYPE(c_long, c_void_p, POINTER(c_void_p)),
+        "Release": WINFUNCTYPE(c_ulong, c_void_p),
+        "GetDisplayName": WINFUNCTYPE(c_long, c_void_p, c_ulong, POINTER(c_wchar_p)),
+    }
+
+
+@PromptServer.instance.routes.post("/bedrot/browse/folder")
+async def browse_for_folder(request):
+    """Open native Windows folder picker and register selected folder as a group."""
     # Run dialog in thread pool to not block event loop
-    loop = asyncio.get_event_loop()
-    folder_path = await loop.run_in_executor(None, open_folder_dialog)
+    folder_path = await asyncio.to_thread(_open_folder_dialog)
 
     if not folder_path:
         return web.json_response({"cancelled": True})
@@ -793,7 +1003,7 @@ async def bedrot_view_image(request):
         return web.Response(status=400, text="No filename provided")
 
     # Resolve group path (handles both local and linked)
-    group_path, is_linked, validation_base = _resolve_group_path(group)
+    group_path, _ = _resolve_group_path(group)
 
     if group_path is None:
         # Try as local group
@@ -801,7 +1011,6 @@ async def bedrot_view_image(request):
             sanitized = _sanitize_path(group)
             base_path = _get_base_path()
             group_path = os.path.join(base_path, sanitized)
-            validation_base = base_path
         except ValueError as e:
             return web.Response(status=400, text=str(e))
 
@@ -814,10 +1023,6 @@ async def bedrot_view_image(request):
     # Build full path
     image_path = os.path.join(group_path, safe_filename)
 
-    # Security check - path must stay within group folder
-    if not _validate_path_within_base(image_path, group_path):
-        return web.Response(status=403, text="Access denied")
-
     if not os.path.exists(image_path):
         return web.Response(status=404, text="Image not found")
 
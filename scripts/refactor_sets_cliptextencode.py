@@ -8,24 +8,59 @@ Usage:
     python refactor_sets_cliptextencode.py --dry-run        # Analyze without writing
     python refactor_sets_cliptextencode.py --limit 10       # Process first 10 files
     python refactor_sets_cliptextencode.py --single FILE    # Process single file
+    python refactor_sets_cliptextencode.py --workers 4      # Limit worker processes
     python refactor_sets_cliptextencode.py                  # Full run
 """
 
 import argparse
-import copy
+import hashlib
+import itertools
 import json
 import logging
+import os
+import struct
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import Optional, Set, Tuple
+from typing import Iterable, Iterator, List, Optional, Set, Tuple, Union
 
 from PIL import Image
-from PIL.PngImagePlugin import PngInfo
+from PIL.PngImagePlugin import MAX_TEXT_CHUNK, MAX_TEXT_MEMORY, PngInfo
+
+try:
+    # Optional: several times faster than json for workflow-sized payloads
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configuration
 SETS_PATH = Path(r"C:\Users\Earth\CSU Fullerton Dropbox\Blake Demarest\favs\SETS")
-POSITIVE_ENCODER_TYPES = {"CLIPTextEncode", "smZ CLIPTextEncode"}
+POSITIVE_ENCODER_TYPES = frozenset({"CLIPTextEncode", "smZ CLIPTextEncode"})
+
+# Positive encoder IDs by workflow text digest (per worker process), as
+# tuples in the order find_positive_encoders' set iterates them.
+# Re-exported copies of a workflow share a result, and copies without
+# positive encoders skip the JSON parse entirely
+ENCODER_CACHE_SIZE = 256
+_ENCODER_CACHE: "OrderedDict[bytes, Tuple[int, ...]]" = OrderedDict()
+
+# Files per task sent to a worker process, and tasks queued per worker
+BATCH_SIZE = 32
+BATCHES_PER_WORKER = 2
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Valid IHDR (bit depth, color type) pairs
+PNG_BIT_DEPTHS = {
+    0: {1, 2, 4, 8, 16},  # grayscale
+    2: {8, 16},           # RGB
+    3: {1, 2, 4, 8},      # palette
+    4: {8, 16},           # grayscale + alpha
+    6: {8, 16},           # RGBA
+}
 
 # Logging setup
 logging.basicConfig(
@@ -47,7 +82,9 @@ class ProcessResult:
     status: ProcessStatus
     message: str
     encoders_replaced: int = 0
-    error: Optional[Exception] = None
+    # repr() of the exception: results cross process boundaries, and
+    # exceptions don't always pickle
+    error: Optional[str] = None
 
 
 @dataclass
@@ -72,6 +109,132 @@ Processing Complete:
 """
 
 
+def _decompress_text(data: bytes) -> Optional[bytes]:
+    """Inflate a compressed text payload, or None if PIL would reject it."""
+    try:
+        dobj = zlib.decompressobj()
+        text = dobj.decompress(data, MAX_TEXT_CHUNK)
+    except zlib.error:
+        return None
+    if dobj.unconsumed_tail:
+        return None
+    return text
+
+
+def read_png_text_chunks(path: Path) -> Optional[dict]:
+    """
+    Read a PNG's text metadata straight from its chunks, without PIL.
+
+    Scans up to the first IDAT, like Image.open does, and decodes tEXt,
+    zTXt and iTXt the same way PngImagePlugin does, so the result matches
+    the text entries of Image.open(path).info.
+
+    Returns:
+        dict or None: Text values by keyword, or None for anything other
+                      than a well-formed PNG (bad signature or CRC,
+                      truncation, unusual chunks...). Callers then fall
+                      back to PIL, which handles or reports it as before.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(8) != PNG_SIGNATURE:
+                return None
+
+            file_size = os.fstat(f.fileno()).st_size
+            text = {}
+            text_memory = 0
+            first = True
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return None
+                length, cid = struct.unpack(">I4s", header)
+                if not cid.isalpha():
+                    return None
+                if first != (cid == b"IHDR"):
+                    return None
+                if cid in (b"IDAT", b"IEND"):
+                    return text
+                if cid == b"acTL":
+                    # Animated PNG: leave frame control validation to PIL
+                    return None
+
+                # Check lengths before reading, so a corrupt header can't
+                # make us allocate gigabytes
+                if length + 4 > file_size - f.tell():
+                    return None
+                if length > MAX_TEXT_CHUNK and cid in (b"tEXt", b"zTXt", b"iTXt"):
+                    return None
+
+                data = f.read(length)
+                crc = f.read(4)
+                if len(data) < length or len(crc) < 4:
+                    return None
+                if zlib.crc32(data, zlib.crc32(cid)) != struct.unpack(">I", crc)[0]:
+                    return None
+
+                if cid == b"IHDR":
+                    first = False
+                    if length < 13:
+                        return None
+                    width, height, depth, color, _, filter_method = struct.unpack(
+                        ">IIBBBB", data[:12]
+                    )
+                    if (filter_method or width == 0 or height == 0
+                            or depth not in PNG_BIT_DEPTHS.get(color, ())):
+                        return None
+                    # Users may disable PIL's decompression bomb check
+                    max_pixels = Image.MAX_IMAGE_PIXELS
+                    if max_pixels is not None and width * height > 2 * max_pixels:
+                        return None
+                    continue
+
+                if cid not in (b"tEXt", b"zTXt", b"iTXt"):
+                    continue
+
+                keyword, sep, value = data.partition(b"\0")
+                if cid == b"tEXt":
+                    value = value.decode("latin-1", "replace")
+                elif cid == b"zTXt":
+                    if value[:1] not in (b"", b"\0"):
+                        return None
+                    value = _decompress_text(value[1:])
+                    if value is None:
+                        return None
+                    value = value.decode("latin-1", "replace")
+                else:
+                    if not sep or len(value) < 2:
+                        return None
+                    compressed, method = value[0], value[1]
+                    fields = value[2:].split(b"\0", 2)
+                    if len(fields) < 3:
+                        return None
+                    lang, translated, value = fields
+                    if compressed:
+                        if method:
+                            return None
+                        value = _decompress_text(value)
+                        if value is None:
+                            return None
+                    try:
+                        lang.decode("utf-8")
+                        translated.decode("utf-8")
+                        value = value.decode("utf-8")
+                    except UnicodeError:
+                        return None
+
+                if keyword:
+                    if keyword == b"exif" and cid == b"tEXt":
+                        # PIL keeps this one as bytes
+                        return None
+                    text[keyword.decode("latin-1")] = value
+                    text_memory += len(value)
+                    if text_memory > MAX_TEXT_MEMORY:
+                        return None
+    except OSError:
+        return None
+
+
 def find_positive_encoders(workflow: dict) -> Set[int]:
     """
     Identify CLIPTextEncode nodes feeding KSampler positive input (slot 1).
@@ -81,32 +244,44 @@ def find_positive_encoders(workflow: dict) -> Set[int]:
     nodes = workflow.get("nodes", [])
     links = workflow.get("links", [])
 
-    # Build lookups
+    # Find KSampler variants, testing each distinct type once rather than
+    # every node. Workflows without any stop here, before building lookups
+    node_types = {node.get("type", "") for node in nodes}
+    ksampler_types = {node_type for node_type in node_types if "KSampler" in node_type}
+    if not ksampler_types:
+        return set()
+
+    # Kept in workflow order: the result set's iteration order (and so the
+    # IDs refactor_workflow hands out) depends on insertion order
+    ksampler_nodes = [node for node in nodes if node.get("type", "") in ksampler_types]
+
+    # Find the links connected to inputs named "positive"
+    positive_link_ids = [
+        inp["link"]
+        for node in ksampler_nodes
+        for inp in node.get("inputs", [])
+        if inp.get("name") == "positive" and inp.get("link") is not None
+    ]
+    if not positive_link_ids:
+        return set()
+
+    # Build lookups; only those few links are needed, not a map of every link
     nodes_by_id = {node["id"]: node for node in nodes}
-    links_by_id = {link[0]: link for link in links}
+    wanted = set(positive_link_ids)
+    links_by_id = {link[0]: link for link in links if link[0] in wanted}
 
     positive_encoder_ids = set()
 
-    for node in nodes:
-        node_type = node.get("type", "")
-
-        # Find KSampler variants
-        if "KSampler" not in node_type:
-            continue
-
-        # Find the link connected to input named "positive"
-        for inp in node.get("inputs", []):
-            if inp.get("name") == "positive" and inp.get("link") is not None:
-                link_id = inp["link"]
-                link = links_by_id.get(link_id)
+    for link_id in positive_link_ids:
+        link = links_by_id.get(link_id)
 
-                if link:
-                    # Link format: [link_id, src_node, src_slot, dst_node, dst_slot, type]
-                    src_node_id = link[1]
-                    src_node = nodes_by_id.get(src_node_id)
+        if link:
+            # Link format: [link_id, src_node, src_slot, dst_node, dst_slot, type]
+            src_node_id = link[1]
+            src_node = nodes_by_id.get(src_node_id)
 
-                    if src_node and src_node.get("type") in POSITIVE_ENCODER_TYPES:
-                        positive_encoder_ids.add(src_node_id)
+            if src_node and src_node.get("type") in POSITIVE_ENCODER_TYPES:
+                positive_encoder_ids.add(src_node_id)
 
     return positive_encoder_ids
 
@@ -202,21 +377,32 @@ def create_preview_link(link_id: int, encoder_id: int, preview_id: int) -> list:
     ]
 
 
-def refactor_workflow(workflow: dict) -> Tuple[dict, int]:
+def refactor_workflow(workflow: dict,
+                      positive_encoder_ids: Optional[Iterable[int]] = None) -> Tuple[dict, int]:
     """
     Main refactoring logic.
 
+    Modifies the workflow in place: callers pass a freshly parsed tree, so
+    a deepcopy (slower than the JSON parse itself) would only be thrown
+    away.
+
+    Args:
+        workflow: Parsed workflow
+        positive_encoder_ids: Result of find_positive_encoders, if already
+            known; new IDs are allocated in its iteration order
+
     Returns:
         Tuple[dict, int]: (modified_workflow, encoder_count)
     """
-    workflow = copy.deepcopy(workflow)
-
-    positive_encoder_ids = find_positive_encoders(workflow)
+    if positive_encoder_ids is None:
+        positive_encoder_ids = find_positive_encoders(workflow)
 
     if not positive_encoder_ids:
         return workflow, 0
 
-    nodes_by_id = {node["id"]: node for node in workflow["nodes"]}
+    # Only the encoders are looked up, so only they are indexed
+    wanted = set(positive_encoder_ids)
+    nodes_by_id = {node["id"]: node for node in workflow["nodes"] if node["id"] in wanted}
     encoders_modified = 0
 
     # Get starting IDs
@@ -260,29 +446,115 @@ def refactor_workflow(workflow: dict) -> Tuple[dict, int]:
     return workflow, encoders_modified
 
 
+def load_json(text: str):
+    """
+    Parse JSON, via orjson if installed.
+
+    Anything orjson rejects (NaN literals, integers beyond 64 bits, lone
+    surrogates) goes to json, which accepts it or raises the usual
+    json.JSONDecodeError.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+
 def validate_json_roundtrip(data: dict) -> str:
     """
     Verify data can be serialized and deserialized without loss.
 
+    With orjson installed the data is serialized compactly (as ComfyUI
+    itself stores workflows) and must parse back equal to the input;
+    anything orjson can't represent exactly, such as NaN, goes through json
+    instead. json.dumps output of a dict always parses back to a dict, so
+    that path is not re-parsed.
+
     Returns:
         str: JSON string if valid
 
     Raises:
         ValueError: If roundtrip fails
     """
-    try:
-        json_str = json.dumps(data, ensure_ascii=False)
-        parsed = json.loads(json_str)
+    if not isinstance(data, dict):
+        raise ValueError("Roundtrip produced non-dict")
 
-        if not isinstance(parsed, dict):
-            raise ValueError("Roundtrip produced non-dict")
+    if orjson is not None:
+        try:
+            json_bytes = orjson.dumps(data)
+            if orjson.loads(json_bytes) == data:
+                return json_bytes.decode("utf-8")
+        except (orjson.JSONEncodeError, orjson.JSONDecodeError):
+            pass
 
-        return json_str
-    except (json.JSONDecodeError, TypeError) as e:
+    try:
+        return json.dumps(data, ensure_ascii=False)
+    except TypeError as e:
         raise ValueError(f"JSON roundtrip failed: {e}")
 
 
-def safe_write_png(path: Path, img: Image.Image, original_metadata: dict,
+def _text_keyword(cid: bytes, data: bytes) -> Optional[bytes]:
+    """Keyword of a tEXt/zTXt/iTXt chunk, or None for other chunks."""
+    if cid in (b"tEXt", b"zTXt", b"iTXt"):
+        return data.partition(b"\0")[0]
+    return None
+
+
+def rewrite_png_workflow(src: Path, dst: Path, workflow_json: str) -> bool:
+    """
+    Copy a PNG, replacing its workflow text chunk.
+
+    All other chunks are copied byte for byte, so the pixel data is not
+    decoded or re-deflated. The new chunk is built by PngInfo.add_text,
+    as in a PIL save; any further workflow chunks are dropped so readers
+    can't pick up a stale copy.
+
+    Returns:
+        bool: False (with dst incomplete) if src isn't a well-formed PNG
+              with a workflow chunk before its image data
+    """
+    info = PngInfo()
+    info.add_text("workflow", workflow_json)
+    new_cid, new_data = info.chunks[0][:2]
+    new_chunk = (struct.pack(">I", len(new_data)) + new_cid + new_data
+                 + struct.pack(">I", zlib.crc32(new_data, zlib.crc32(new_cid))))
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        if fsrc.read(8) != PNG_SIGNATURE:
+            return False
+        fdst.write(PNG_SIGNATURE)
+
+        replaced = False
+        seen_idat = False
+        while True:
+            header = fsrc.read(8)
+            if len(header) < 8:
+                return False
+            length, cid = struct.unpack(">I4s", header)
+            data = fsrc.read(length)
+            crc = fsrc.read(4)
+            if len(data) < length or len(crc) < 4:
+                return False
+
+            if _text_keyword(cid, data) == b"workflow":
+                if not replaced and not seen_idat:
+                    fdst.write(new_chunk)
+                    replaced = True
+                continue
+
+            if cid == b"IDAT":
+                seen_idat = True
+            fdst.write(header)
+            fdst.write(data)
+            fdst.write(crc)
+
+            if cid == b"IEND":
+                return replaced
+
+
+def safe_write_png(path: Path, img: Optional[Image.Image], original_metadata: dict,
                    modified_workflow: dict) -> None:
     """
     Safely write PNG with modified workflow metadata.
@@ -290,39 +562,52 @@ def safe_write_png(path: Path, img: Image.Image, original_metadata: dict,
     Uses atomic write pattern: write to temp file, then rename.
     Preserves ALL original metadata keys.
 
+    Only the workflow chunk changes, so it is swapped in the original
+    chunk stream (rewrite_png_workflow) instead of re-encoding the pixels.
+    Files that can't be rewritten that way are re-saved with PIL, opening
+    the image if img isn't given.
+
     Raises:
         IOError: If write fails
     """
     # Validate workflow JSON first
     workflow_json = validate_json_roundtrip(modified_workflow)
 
-    # Build new metadata preserving all original keys
-    metadata = PngInfo()
-
-    for key, value in original_metadata.items():
-        if key == "workflow":
-            metadata.add_text("workflow", workflow_json)
-        elif isinstance(value, str):
-            metadata.add_text(key, value)
-
     # Atomic write: temp file then rename
     temp_path = path.with_suffix(".tmp.png")
 
     try:
-        img.save(temp_path, format="PNG", pnginfo=metadata)
-
-        # Verify the temp file is valid before replacing
-        verify_img = Image.open(temp_path)
-        verify_workflow = json.loads(verify_img.info.get("workflow", "{}"))
+        if not rewrite_png_workflow(path, temp_path, workflow_json):
+            # Build new metadata preserving all original keys
+            metadata = PngInfo()
+
+            for key, value in original_metadata.items():
+                if key == "workflow":
+                    metadata.add_text("workflow", workflow_json)
+                elif isinstance(value, str):
+                    metadata.add_text(key, value)
+
+            if img is None:
+                with Image.open(path) as img:
+                    img.save(temp_path, format="PNG", pnginfo=metadata)
+            else:
+                img.save(temp_path, format="PNG", pnginfo=metadata)
+
+        # Verify the temp file is valid before replacing. The chunk scan
+        # checks the same structure and CRCs as Image.open, and reads the
+        # same text, without setting up a decoder. Files it leaves to PIL
+        # (APNGs, tEXt exif...) are checked by Image.open, which raises on
+        # a broken file
+        verify_text = read_png_text_chunks(temp_path)
+        if verify_text is None:
+            with Image.open(temp_path) as verify_img:
+                verify_text = verify_img.info
+        verify_workflow = load_json(verify_text.get("workflow", "{}"))
         if not verify_workflow.get("nodes"):
             raise IOError("Written file has empty/invalid workflow")
-        verify_img.close()
 
-        # On Windows, must remove target first
-        if path.exists():
-            path.unlink()
-
-        temp_path.rename(path)
+        # Atomically replaces the target, on Windows too
+        os.replace(temp_path, path)
 
     except Exception as e:
         # Clean up temp file on failure
@@ -331,10 +616,15 @@ def safe_write_png(path: Path, img: Image.Image, original_metadata: dict,
         raise IOError(f"Write failed: {e}")
 
 
-def process_png(path: Path, dry_run: bool = False) -> ProcessResult:
+def process_png(path: Union[str, Path], dry_run: bool = False) -> ProcessResult:
     """
     Process a single PNG file.
 
+    Most files need no rewrite, and deciding that only takes the text
+    metadata, which is read straight from the chunks. Rewrites swap the
+    workflow chunk in place, so well-formed PNGs never go through PIL's
+    decoder.
+
     Args:
         path: Path to PNG file
         dry_run: If True, analyze but do not write
@@ -342,51 +632,148 @@ def process_png(path: Path, dry_run: bool = False) -> ProcessResult:
     Returns:
         ProcessResult
     """
+    path = Path(path)
+    img = None
     try:
-        img = Image.open(path)
-        original_metadata = dict(img.info)
-    except Exception as e:
-        return ProcessResult(ProcessStatus.ERROR, f"Cannot open file: {e}", error=e)
-
-    if "workflow" not in original_metadata:
-        img.close()
-        return ProcessResult(ProcessStatus.NO_WORKFLOW, "No workflow metadata found")
-
-    try:
-        workflow = json.loads(original_metadata["workflow"])
-    except json.JSONDecodeError as e:
-        img.close()
-        return ProcessResult(ProcessStatus.ERROR, f"Invalid JSON in source: {e}", error=e)
+        text = read_png_text_chunks(path)
+        if text is None:
+            # Not a PNG the chunk scanner handles; let PIL read it (or
+            # report why it can't)
+            try:
+                img = Image.open(path)
+                # Only read (the image stays open until we return), so
+                # no copy is needed
+                text = img.info
+            except Exception as e:
+                return ProcessResult(ProcessStatus.ERROR, f"Cannot open file: {e}", error=repr(e))
+
+        if "workflow" not in text:
+            return ProcessResult(ProcessStatus.NO_WORKFLOW, "No workflow metadata found")
+
+        workflow_text = text["workflow"]
+
+        # Without both markers no node can be a positive encoder feeding a
+        # KSampler, so the JSON isn't even parsed (nor checked for errors).
+        # Text with \u escapes could spell them differently and is parsed
+        if "\\u" not in workflow_text and (
+                "KSampler" not in workflow_text or "CLIPTextEncode" not in workflow_text):
+            return ProcessResult(ProcessStatus.SKIPPED, "No positive encoder found")
+
+        cache_key = hashlib.blake2b(
+            workflow_text.encode("utf-8", "surrogatepass"), digest_size=16
+        ).digest()
+        positive_encoder_ids = _ENCODER_CACHE.get(cache_key)
+        if positive_encoder_ids is not None:
+            _ENCODER_CACHE.move_to_end(cache_key)
+            if not positive_encoder_ids:
+                return ProcessResult(ProcessStatus.SKIPPED, "No positive encoder found")
+
+        try:
+            workflow = load_json(workflow_text)
+        except json.JSONDecodeError as e:
+            return ProcessResult(ProcessStatus.ERROR, f"Invalid JSON in source: {e}", error=repr(e))
+
+        try:
+            if positive_encoder_ids is None:
+                positive_encoder_ids = tuple(find_positive_encoders(workflow))
+                _ENCODER_CACHE[cache_key] = positive_encoder_ids
+                if len(_ENCODER_CACHE) > ENCODER_CACHE_SIZE:
+                    _ENCODER_CACHE.popitem(last=False)
+            modified_workflow, encoder_count = refactor_workflow(workflow, positive_encoder_ids)
+        except Exception as e:
+            return ProcessResult(ProcessStatus.ERROR, f"Refactor failed: {e}", error=repr(e))
+
+        if encoder_count == 0:
+            return ProcessResult(ProcessStatus.SKIPPED, "No positive encoder found")
+
+        if dry_run:
+            return ProcessResult(
+                ProcessStatus.MODIFIED,
+                f"Would replace {encoder_count} encoder(s)",
+                encoders_replaced=encoder_count
+            )
+
+        try:
+            safe_write_png(path, img, text, modified_workflow)
+            return ProcessResult(
+                ProcessStatus.MODIFIED,
+                f"Replaced {encoder_count} encoder(s)",
+                encoders_replaced=encoder_count
+            )
+        except IOError as e:
+            return ProcessResult(ProcessStatus.ERROR, f"Write failed: {e}", error=repr(e))
+    finally:
+        if img is not None:
+            img.close()
+
+
+def process_png_batch(paths: List[str], dry_run: bool = False) -> List[ProcessResult]:
+    """Process several PNG files in one worker task."""
+    return [process_png(path, dry_run) for path in paths]
+
+
+def iter_results(executor: Executor, paths: Iterable[str], dry_run: bool,
+                 max_pending: int) -> Iterator[Tuple[str, ProcessResult]]:
+    """
+    Process paths on executor, yielding (path, result) in input order.
 
-    try:
-        modified_workflow, encoder_count = refactor_workflow(workflow)
-    except Exception as e:
-        img.close()
-        return ProcessResult(ProcessStatus.ERROR, f"Refactor failed: {e}", error=e)
+    Paths are submitted in batches of BATCH_SIZE, with at most max_pending
+    batches queued at a time, so memory stays flat however many files the
+    walk turns up (Executor.map submits everything up front).
+    """
+    paths = iter(paths)
+    pending = deque()
+    while True:
+        batch = list(itertools.islice(paths, BATCH_SIZE))
+        if batch:
+            pending.append((batch, executor.submit(process_png_batch, batch, dry_run)))
+            if len(pending) < max_pending:
+                continue
+        if not pending:
+            return
+        done_batch, future = pending.popleft()
+        yield from zip(done_batch, future.result())
 
-    if encoder_count == 0:
-        img.close()
-        return ProcessResult(ProcessStatus.SKIPPED, "No positive encoder found")
 
-    if dry_run:
-        img.close()
-        return ProcessResult(
-            ProcessStatus.MODIFIED,
-            f"Would replace {encoder_count} encoder(s)",
-            encoders_replaced=encoder_count
-        )
+def iter_png_paths(root: Path, limit: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield paths of PNG files under root, stopping after limit files if given.
 
-    try:
-        safe_write_png(path, img, original_metadata, modified_workflow)
-        img.close()
-        return ProcessResult(
-            ProcessStatus.MODIFIED,
-            f"Replaced {encoder_count} encoder(s)",
-            encoders_replaced=encoder_count
-        )
-    except IOError as e:
-        img.close()
-        return ProcessResult(ProcessStatus.ERROR, f"Write failed: {e}", error=e)
+    Walks with os.scandir directly, in the same top-down order as os.walk
+    (which doesn't follow directory symlinks either), but yields the
+    DirEntry path strings without building Path objects or name lists.
+    """
+    count = 0
+    stack = [os.fspath(root)]
+    while stack:
+        subdirs = []
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+
+                    if is_dir:
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                        continue
+
+                    if not entry.name.lower().endswith('.png'):
+                        continue
+
+                    if limit and count >= limit:
+                        return
+
+                    yield entry.path
+                    count += 1
+        except OSError:
+            # Unreadable directory; os.walk skips these too
+            pass
+
+        # Reversed so the first subdirectory is popped (walked) first
+        stack.extend(reversed(subdirs))
 
 
 def parse_args() -> argparse.Namespace:
@@ -409,6 +796,12 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Process only first N files (for testing)"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: CPU count)"
+    )
     parser.add_argument(
         "--single",
         type=str,
@@ -445,8 +838,6 @@ def main():
         logger.error(f"SETS path does not exist: {SETS_PATH}")
         return
 
-    # Stream PNG files using os.walk (faster than rglob on Windows)
-    import os
     print(f"Processing PNG files in {SETS_PATH}...", flush=True)
     if args.dry_run:
         print("DRY RUN MODE - No files will be modified", flush=True)
@@ -455,40 +846,39 @@ def main():
     stats = ProcessingStats()
     i = 0
 
-    for root, dirs, files in os.walk(SETS_PATH):
-        for filename in files:
-            if not filename.lower().endswith('.png'):
-                continue
-
-            if args.limit and i >= args.limit:
-                break
+    # Files are independent, so they are processed in parallel; results
+    # come back in walk order
+    png_paths = iter_png_paths(SETS_PATH, args.limit)
+    max_pending = BATCHES_PER_WORKER * (args.workers or os.cpu_count() or 1)
+    # Checked once: the per-file debug calls are skipped entirely unless
+    # --verbose is given
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
 
-            png_path = Path(root) / filename
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for png_path, result in iter_results(executor, png_paths, args.dry_run, max_pending):
             i += 1
 
             # Progress update every 500 files
             if i % 500 == 0:
                 print(f"Progress: {i} files processed, {stats.modified} modified", flush=True)
 
-            result = process_png(png_path, dry_run=args.dry_run)
             stats.processed += 1
 
             if result.status == ProcessStatus.MODIFIED:
                 stats.modified += 1
                 stats.encoders_replaced += result.encoders_replaced
-                logger.debug(f"Modified: {png_path}")
+                if debug_enabled:
+                    logger.debug("Modified: %s", png_path)
             elif result.status == ProcessStatus.SKIPPED:
                 stats.skipped += 1
             elif result.status == ProcessStatus.NO_WORKFLOW:
                 stats.skipped += 1
-                logger.debug(f"No workflow: {png_path}")
+                if debug_enabled:
+                    logger.debug("No workflow: %s", png_path)
             elif result.status == ProcessStatus.ERROR:
                 stats.errors += 1
                 stats.error_files.append((png_path, result.message))
-                logger.warning(f"Error in {png_path}: {result.message}")
-
-        if args.limit and i >= args.limit:
-            break
+                logger.warning("Error in %s: %s", png_path, result.message)
 
     stats.total_files = i
     print(stats.report(), flush=True)
@@ -11,7 +11,11 @@ from pathlib import Path
 # Add parent directory to path so we can import the node
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from bedrot_cliptextencoder.nodes import BedrotCLIPTextEncode
+from bedrot_cliptextencoder.nodes import (
+    BedrotCLIPTextEncode,
+    _compile_cached,
+    _preprocess_cached,
+)
 
 
 @pytest.fixture
@@ -20,6 +24,16 @@ def encoder():
     return BedrotCLIPTextEncode()
 
 
+class StubClip:
+    """Minimal CLIP stand-in that echoes the tokenized text."""
+
+    def tokenize(self, text):
+        return text
+
+    def encode_from_tokens_scheduled(self, tokens):
+        return [[tokens, {}]]
+
+
 class TestFlagExtraction:
     """Tests for flag token [N] extraction and removal."""
 
@@ -51,6 +65,11 @@ class TestInvalidNegativeTokens:
         result = encoder._preprocess_conditional_brackets("[-1] [-2] hello")
         assert result == "hello"
 
+    def test_negative_joined_by_flag_removal(self, encoder):
+        """Removing [1] from [-[1]5] leaves [-5], which is removed too."""
+        result = encoder._preprocess_conditional_brackets("[-[1]5] hello")
+        assert result == "hello"
+
 
 class TestPositiveConditionalBlocks:
     """Tests for [K: content] blocks where K > 0."""
@@ -143,12 +162,33 @@ class TestWhitespaceCleanup:
         result = encoder._preprocess_conditional_brackets("  hello  ")
         assert result == "hello"
 
+    def test_repeated_commas_collapsed(self, encoder):
+        result = encoder._preprocess_conditional_brackets("hello, , ,world")
+        assert result == "hello,world"
+
+    def test_leading_comma_removed(self, encoder):
+        result = encoder._preprocess_conditional_brackets(" , hello")
+        assert result == "hello"
+
     def test_cleanup_after_removal(self, encoder):
         """Whitespace should be cleaned after conditional removal."""
         result = encoder._preprocess_conditional_brackets("[1: removed] hello")
         assert result == "hello"
 
 
+class TestSuppressionRules:
+    """Tests for trigger/@/targets/@/ suppression."""
+
+    def test_target_suppressed_when_trigger_present(self, encoder):
+        prompt = "brown hair/@/blonde hair,red hair/@/, blonde hair, eyes"
+        result = encoder._preprocess_conditional_brackets(prompt)
+        assert result == "brown hair, eyes"
+
+    def test_absent_targets_only_normalize(self, encoder):
+        result = encoder._apply_suppress_rules("a ,b", {"a": ["c"]})
+        assert result == "a, b"
+
+
 class TestEdgeCases:
     """Edge cases and boundary conditions."""
 
@@ -201,3 +241,57 @@ class TestRealisticPrompts:
         result = encoder._preprocess_conditional_brackets(prompt)
         assert "detailed face" in result
         assert "simple background" not in result
+
+
+class TestCompiledConditionals:
+    """Tests for the parse/evaluate split of conditional blocks."""
+
+    def test_compile_segments(self, encoder):
+        segments = encoder._compile_conditional_blocks("a [1: b [-2: c]] d")
+        assert segments == ["a ", (1, ["b ", (-2, ["c"])]), " d"]
+
+    def test_unbalanced_head_stays_literal(self, encoder):
+        assert encoder._compile_conditional_blocks("a [1: b") == ["a [1: b"]
+
+    def test_flag_changes_share_one_parse(self, encoder):
+        _compile_cached.cache_clear()
+        assert encoder._preprocess_conditional_brackets("[1] [1: a] [-2: b]") == "a b"
+        assert encoder._preprocess_conditional_brackets("[2] [1: a] [-2: b]") == ""
+        info = _compile_cached.cache_info()
+        assert (info.hits, info.misses) == (1, 1)
+
+
+class TestBracketMatching:
+    """Tests for bracket matching used by conditionals and tag bypass."""
+
+    def test_mixed_nesting(self, encoder):
+        assert encoder._build_bracket_map("a [1: (b)] c") == {2: 9, 6: 8}
+
+    def test_unbalanced_same_type_propagates(self, encoder):
+        assert encoder._build_bracket_map("[1: [2: x]") == {4: 9}
+
+    def test_stray_closer_of_other_type_ignored(self, encoder):
+        assert encoder._build_bracket_map("[a ) b]") == {0: 6}
+
+    def test_deep_nesting(self, encoder):
+        """Nesting deeper than the interpreter recursion limit."""
+        depth = sys.getrecursionlimit() + 100
+        prompt = "[1] " + "[1: a " * depth + "]" * depth
+        result = encoder._preprocess_conditional_brackets(prompt)
+        assert result == " ".join(["a"] * depth)
+
+
+class TestEncode:
+    """Tests for the encode() entry point."""
+
+    def test_encode_returns_processed_text(self, encoder):
+        conditioning, processed = encoder.encode(StubClip(), "[1] a, [1: b], [-1: c]")
+        assert processed == "a, b,"
+        assert conditioning == [["a, b,", {}]]
+
+    def test_encode_reuses_cached_preprocessing(self, encoder):
+        _preprocess_cached.cache_clear()
+        encoder.encode(StubClip(), "[2] x, [2: y]")
+        encoder.encode(StubClip(), "[2] x, [2: y]")
+        info = _preprocess_cached.cache_info()
+        assert (info.hits, info.misses) == (1, 1)
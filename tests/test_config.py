@@ -0,0 +1,97 @@
+"""
+Unit tests for the BEDROT Load Image config caches.
+
+Run with: pytest tests/ -v
+"""
+
+import importlib.util
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+CONFIG_PATH = Path(__file__).parent.parent / "bedrot_loadimage" / "config.py"
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """Fresh config module with its config file and base folder in tmp_path."""
+    # Loaded from the file, so the package's ComfyUI imports aren't needed
+    spec = importlib.util.spec_from_file_location("bedrot_config", CONFIG_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    config_file = tmp_path / "linked_folders.json"
+    base_path = tmp_path / "base"
+    base_path.mkdir()
+    monkeypatch.setattr(module, "_get_config_path", lambda: str(config_file))
+    monkeypatch.setattr(module, "_get_base_input_path", lambda: str(base_path))
+    return module
+
+
+def _folders(*names):
+    return [{"name": name, "path": f"/links/{name}"} for name in names]
+
+
+class TestLinkedFolders:
+    """Tests for the parsed config file cache."""
+
+    def test_save_then_load_same_mtime(self, config):
+        config.save_linked_folders(_folders("aaa"))
+        assert config.load_linked_folders() == _folders("aaa")
+
+        # Same size and mtime: only the invalidation in save reveals it
+        st = os.stat(config._get_config_path())
+        config.save_linked_folders(_folders("bbb"))
+        os.utime(config._get_config_path(), ns=(st.st_atime_ns, st.st_mtime_ns))
+
+        assert config.load_linked_folders() == _folders("bbb")
+        assert config.is_linked_folder("bbb")
+        assert not config.is_linked_folder("aaa")
+
+    def test_duplicate_names_first_entry_wins(self, config):
+        folders = [{"name": "Dup", "path": "/first"}, {"name": "dup", "path": "/second"}]
+        with open(config._get_config_path(), "w", encoding="utf-8") as f:
+            json.dump({"linked_folders": folders}, f)
+
+        assert config.get_linked_folder_path("DUP") == "/first"
+        assert config.get_linked_folder_path("dup") == "/first"
+        assert config.is_linked_folder("dUp")
+
+    def test_failed_replace_leaves_no_temp_or_stale_cache(self, config, monkeypatch):
+        config.save_linked_folders(_folders("old"))
+        assert config.load_linked_folders() == _folders("old")
+
+        def fail_replace(src, dst):
+            raise OSError("replace failed")
+
+        with monkeypatch.context() as m:
+            m.setattr(config.os, "replace", fail_replace)
+            with pytest.raises(OSError):
+                config.save_linked_folders(_folders("new"))
+
+        assert not os.path.exists(config._get_config_path() + ".tmp")
+        assert config.load_linked_folders() == _folders("old")
+        assert config.get_linked_folder_path("new") is None
+
+
+class TestLocalGroupNames:
+    """Tests for the local group name cache."""
+
+    def test_names_listed_and_lowercased(self, config):
+        (Path(config._get_base_input_path()) / "Portraits").mkdir()
+        assert config.get_local_group_names() == ("Portraits",)
+        assert config._get_local_group_names() == frozenset({"portraits"})
+
+    def test_failed_scan_not_cached(self, config, monkeypatch):
+        (Path(config._get_base_input_path()) / "Group").mkdir()
+
+        def fail_scandir(path):
+            raise PermissionError(path)
+
+        with monkeypatch.context() as m:
+            m.setattr(config.os, "scandir", fail_scandir)
+            assert config._get_local_group_names() == frozenset()
+
+        assert config._get_local_group_names() == frozenset({"group"})
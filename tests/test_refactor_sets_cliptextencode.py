@@ -0,0 +1,93 @@
+"""
+Unit tests for the SETS folder CLIPTextEncode refactor script.
+
+Run with: pytest tests/ -v
+"""
+
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageSequence
+from PIL.PngImagePlugin import PngInfo
+
+SCRIPT_PATH = Path(__file__).parent.parent / "scripts" / "refactor_sets_cliptextencode.py"
+_spec = importlib.util.spec_from_file_location("refactor_sets_cliptextencode", SCRIPT_PATH)
+refactor = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(refactor)
+
+WORKFLOW = {
+    "last_node_id": 2,
+    "last_link_id": 1,
+    "nodes": [
+        {"id": 1, "type": "CLIPTextEncode", "pos": [0, 0],
+         "outputs": [{"name": "CONDITIONING", "type": "CONDITIONING", "links": [1]}]},
+        {"id": 2, "type": "KSampler", "pos": [400, 0],
+         "inputs": [{"name": "positive", "type": "CONDITIONING", "link": 1}]},
+    ],
+    "links": [[1, 1, 0, 2, 1, "CONDITIONING"]],
+}
+
+
+@pytest.fixture
+def apng_path(tmp_path):
+    """Write a 2-frame animated PNG carrying WORKFLOW."""
+    path = tmp_path / "anim.png"
+    info = PngInfo()
+    info.add_text("workflow", json.dumps(WORKFLOW))
+    frames = [Image.new("RGB", (8, 8), color) for color in ("red", "blue")]
+    frames[0].save(path, save_all=True, append_images=frames[1:], pnginfo=info)
+    return path
+
+
+class TestApng:
+    """Animated PNGs are left to PIL by the chunk scanner."""
+
+    def test_scanner_defers_to_pil(self, apng_path):
+        assert refactor.read_png_text_chunks(apng_path) is None
+
+    def test_apng_rewritten(self, apng_path):
+        result = refactor.process_png(apng_path)
+        assert result.status == refactor.ProcessStatus.MODIFIED
+        assert result.encoders_replaced == 1
+
+        with Image.open(apng_path) as img:
+            workflow = json.loads(img.info["workflow"])
+            assert getattr(img, "n_frames", 1) == 2
+            assert [frame.convert("RGB").getpixel((0, 0))
+                    for frame in ImageSequence.Iterator(img)] == [(255, 0, 0), (0, 0, 255)]
+        assert workflow["nodes"][0]["type"] == "BedrotCLIPTextEncode"
+        assert not apng_path.with_suffix(".tmp.png").exists()
+
+
+@pytest.fixture
+def png_path(tmp_path):
+    """Write a single-frame PNG carrying WORKFLOW."""
+    path = tmp_path / "still.png"
+    info = PngInfo()
+    info.add_text("workflow", json.dumps(WORKFLOW))
+    Image.new("RGB", (8, 8), "red").save(path, pnginfo=info)
+    return path
+
+
+class TestChunkScanner:
+    """Tests for read_png_text_chunks on unusual input."""
+
+    def test_reads_workflow(self, png_path):
+        text = refactor.read_png_text_chunks(png_path)
+        assert json.loads(text["workflow"]) == WORKFLOW
+
+    def test_bomb_check_disabled(self, png_path, monkeypatch):
+        monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", None)
+        assert "workflow" in refactor.read_png_text_chunks(png_path)
+
+    def test_corrupt_length_not_read(self, png_path):
+        data = bytearray(png_path.read_bytes())
+        pos = data.index(b"tEXt") - 4
+        data[pos:pos + 4] = b"\xff\xff\xff\xf0"
+        png_path.write_bytes(bytes(data))
+
+        assert refactor.read_png_text_chunks(png_path) is None
+        result = refactor.process_png(png_path)
+        assert result.status == refactor.ProcessStatus.ERROR